@@ -24,7 +24,7 @@ sys.path.append(os.path.abspath('sphinxext'))
 # -- General configuration ------------------------------------------------
 
 # If your documentation needs a minimal Sphinx version, state it here.
-needs_sphinx = '1.5'
+needs_sphinx = '2.1'
 
 # Add any Sphinx extension module names here, as strings. They can be
 # extensions coming with Sphinx (named 'sphinx.ext.*') or your custom
@@ -204,7 +204,7 @@ latex_elements = {
 'pointsize': '10pt',
 
 # Additional stuff for the LaTeX preamble.
-'preamble': ur'''
+'preamble': r'''
 \hypersetup{pdftitle={%s},
             pdfauthor={Gert-Ludwig Ingold <gert.ingold@physik.uni-augsburg.de>},
             pdfsubject={Manuskript zur Vorlesung »%s«},
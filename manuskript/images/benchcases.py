@@ -0,0 +1,257 @@
+"""Benchmark cases behind the timing figures.
+
+Run as a script, the given cases are timed and the results written as JSON,
+e.g.
+
+    python benchcases.py -o numba_parallel.json zeta-cpu zeta-parallel
+
+Parameters of the default sweeps can be replaced with -s name=value, where
+several comma-separated values define a new sweep. With --store, the run is
+also appended to the regression store of benchstore.
+"""
+
+import argparse
+from ast import literal_eval
+from collections import deque
+from concurrent import futures
+from functools import partial
+from itertools import product
+import math
+import os
+import sys
+
+import numpy as np
+
+from benchmark import CASES, case, run, save, shared_context
+from benchstore import DEFAULT_STORE, record
+from mandelbrot import (mandelbrot_dynamic, mandelbrot_shared, mandelbrot_tile,
+                        render)
+import expressions
+import pi_agm
+import pidigits
+from sieve import prime_count
+import zeta as zeta_sum
+from workerpool import WarmPool
+
+NMAX = tuple(int(n) for n in np.logspace(0.31, 6, 20))
+NDIV = (1, 2, 4, 8, 16, 32, 64, 128)
+
+@case('sin-numpy', nmax=NMAX)
+def sin_numpy(nmax):
+    def f_numpy():
+        x = np.linspace(0, np.pi, nmax)
+        return np.sin(x)
+    yield f_numpy
+
+@case('sin-math', nmax=NMAX)
+def sin_math(nmax):
+    def f_math():
+        dx = math.pi/(nmax-1)
+        return [math.sin(n*dx) for n in range(nmax)]
+    yield f_math
+
+@case('poly-numpy', nmax=NMAX)
+def poly_numpy(nmax):
+    def f_numpy():
+        x = np.linspace(0, 1, nmax)
+        return ((5*x-2)*x+1)*x-7
+    yield f_numpy
+
+@case('poly-numexpr', nmax=NMAX)
+def poly_numexpr(nmax):
+    import numexpr as ne
+    def f_numexpr():
+        x = np.linspace(0, 1, nmax)
+        return ne.evaluate('5*x**3-2*x**2+x-7')
+    yield f_numexpr
+
+@case('poly-evaluate', backend=expressions.BACKENDS+('auto',), nmax=NMAX)
+def poly_evaluate(backend, nmax):
+    x = np.linspace(0, 1, nmax)
+    backend = None if backend == 'auto' else backend
+    expressions.evaluate('5*x**3-2*x**2+x-7', backend=backend, x=x)
+    yield partial(expressions.evaluate, '5*x**3-2*x**2+x-7', backend=backend,
+                  x=x)
+
+def warm_pool(workers, modules):
+    """Return a context for a WarmPool shared by all points of a run."""
+    return shared_context(('warm-pool', workers, modules),
+                          partial(WarmPool, max_workers=workers,
+                                  modules=modules))
+
+def mandelbrot_grid(npts):
+    return np.mgrid[-1.5:1.5:npts*1j, -2:1:npts*1j]
+
+def tiles(cx, cy, ndiv):
+    nlen = cx.shape[0]//ndiv
+    return [(nx, ny,
+             cx[nx*nlen:(nx+1)*nlen, ny*nlen:(ny+1)*nlen],
+             cy[nx*nlen:(nx+1)*nlen, ny*nlen:(ny+1)*nlen])
+            for nx, ny in product(range(ndiv), repeat=2)]
+
+def store_tiles(shape, ndiv, results):
+    nlen = shape[0]//ndiv
+    data = np.zeros(shape, dtype=np.int64)
+    for nx, ny, result in results:
+        data[nx*nlen:(nx+1)*nlen, ny*nlen:(ny+1)*nlen] = result
+    return data
+
+def mandelbrot_single(cx, cy, nitermax, ndiv):
+    return store_tiles(cx.shape, ndiv,
+                       [mandelbrot_tile(nitermax, *tile)
+                        for tile in tiles(cx, cy, ndiv)])
+
+def mandelbrot_pool(cx, cy, nitermax, ndiv, executor):
+    wait_for = [executor.submit(partial(mandelbrot_tile, nitermax), *tile)
+                for tile in tiles(cx, cy, ndiv)]
+    return store_tiles(cx.shape, ndiv,
+                       [f.result() for f in futures.as_completed(wait_for)])
+
+@case('mandelbrot-single', ndiv=NDIV, npts=1024, nitermax=2000)
+def mandelbrot_single_case(ndiv, npts, nitermax):
+    cy, cx = mandelbrot_grid(npts)
+    yield partial(mandelbrot_single, cx, cy, nitermax, ndiv)
+
+@case('mandelbrot-pool', ndiv=NDIV, npts=1024, nitermax=2000, workers=4,
+      schedule='static', shared=False)
+def mandelbrot_pool_case(ndiv, npts, nitermax, workers, schedule, shared):
+    cy, cx = mandelbrot_grid(npts)
+    with warm_pool(workers, ('numpy', 'mandelbrot')) as pool:
+        if schedule == 'dynamic':
+            yield partial(mandelbrot_dynamic, cx, cy, nitermax, ndiv, workers,
+                          shared=shared, executor=pool)
+        elif shared:
+            yield partial(mandelbrot_shared, cx, cy, nitermax, ndiv, workers,
+                          pool)
+        else:
+            yield partial(mandelbrot_pool, cx, cy, nitermax, ndiv, pool)
+
+@case('mandelbrot-tile', backend=('numpy', 'numba-serial'), npts=256,
+      nitermax=2000)
+def mandelbrot_tile_case(backend, npts, nitermax):
+    cy, cx = np.mgrid[-0.1:0.1:npts*1j, -0.85:-0.65:npts*1j]
+    yield partial(render, cx, cy, nitermax, backend)
+
+@case('mandelbrot-threads', threads=tuple(range(1, os.cpu_count()+1)),
+      npts=1024, nitermax=2000)
+def mandelbrot_threads_case(threads, npts, nitermax):
+    import numba
+    cy, cx = mandelbrot_grid(npts)
+    previous = numba.get_num_threads()
+    numba.set_num_threads(threads)
+    try:
+        yield partial(render, cx, cy, nitermax, 'numba-parallel')
+    finally:
+        numba.set_num_threads(previous)
+
+def zeta_ufunc(target):
+    from numba import float64, int64, vectorize
+
+    @vectorize([float64(float64, int64)], target=target)
+    def zeta(x, nmax):
+        summe = 0.
+        for n in range(nmax):
+            summe = summe+1./((n+1)**x)
+        return summe
+    return zeta
+
+@case('zeta-cpu', nmax=10**7, nvalues=200)
+def zeta_cpu(nmax, nvalues):
+    zeta = zeta_ufunc('cpu')
+    x = np.linspace(2, 10, nvalues, dtype=np.float64)
+    yield partial(zeta, x, nmax)
+
+@case('zeta-parallel', threads=tuple(range(1, os.cpu_count()+1)),
+      nmax=10**7, nvalues=200)
+def zeta_parallel(threads, nmax, nvalues):
+    import numba
+    zeta = zeta_ufunc('parallel')
+    x = np.linspace(2, 10, nvalues, dtype=np.float64)
+    previous = numba.get_num_threads()
+    numba.set_num_threads(threads)
+    try:
+        yield partial(zeta, x, nmax)
+    finally:
+        numba.set_num_threads(previous)
+
+@case('zeta-jit', x=(2, 2.5), nmax=10**7)
+def zeta_jit(x, nmax):
+    import numba
+
+    @numba.jit
+    def zeta(x, nmax):
+        summe = 0
+        for n in range(1, nmax+1):
+            summe = summe+1/(n**x)
+        return summe
+    yield partial(zeta, x, nmax)
+
+@case('pi-agm', stellen=10000)
+def pi_agm_case(stellen):
+    yield partial(pi_agm.pi_digits, stellen)
+
+@case('pi-fast', method=pidigits.METHODS, stellen=100000)
+def pi_fast_case(method, stellen):
+    yield partial(pidigits.pi_digits, stellen, method)
+
+@case('zeta-sum', workers=(1, 2, 4), nmax=10**6, nvalues=200)
+def zeta_sum_case(workers, nmax, nvalues):
+    x = np.linspace(2, 10, nvalues, dtype=np.float64)
+    yield partial(zeta_sum.zeta, x, nmax, tail=False, max_workers=workers)
+
+@case('ipython-lexer', session=('code', 'output'), lines=(10**3, 10**4, 10**5))
+def ipython_lexer_case(session, lines):
+    sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                 '..', 'sphinxext'))
+    from ipython_console_highlighting import IPythonConsoleLexer
+    if session == 'code':
+        text = ''.join('In [{0}]: x = {0}\n   ...: y = x\nOut[{0}]: {0}\n'
+                       .format(n) for n in range(lines//3))
+    else:
+        text = 'In [1]: print(a)\n'+'[ 0.1  0.2  0.3  0.4]\n'*lines
+    lexer = IPythonConsoleLexer()
+    # consume the tokens without keeping them, as the growing list would
+    # make the garbage collector add a superlinear part to the time
+    yield lambda: deque(lexer.get_tokens_unprocessed(text), maxlen=0)
+
+@case('prime-count', workers=(1, 2, 4), x=10**8)
+def prime_count_case(workers, x):
+    with warm_pool(workers, ('numpy', 'sieve')) as pool:
+        yield partial(prime_count, x, max_workers=workers, executor=pool)
+
+def parse_overrides(assignments):
+    overrides = {}
+    for assignment in assignments:
+        name, _, values = assignment.partition('=')
+        values = [literal_eval(v) for v in values.split(',')]
+        overrides[name] = values if len(values) > 1 else values[0]
+    return overrides
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Run benchmark cases.')
+    parser.add_argument('cases', nargs='*', help='names of the cases')
+    parser.add_argument('-l', '--list', action='store_true',
+                        help='list the registered cases')
+    parser.add_argument('-o', '--output', default='benchmark.json')
+    parser.add_argument('-r', '--repeat', type=int, default=5)
+    parser.add_argument('-w', '--warmup', type=int, default=1)
+    parser.add_argument('-t', '--mintime', type=float, default=0.,
+                        help='minimal duration of one repetition in seconds')
+    parser.add_argument('-s', '--set', action='append', default=[],
+                        metavar='NAME=VALUES', help='replace a parameter')
+    parser.add_argument('--store', nargs='?', const=DEFAULT_STORE,
+                        help='append the results to a regression store')
+    args = parser.parse_args(argv)
+    if args.list or not args.cases:
+        for name, benchmark in CASES.items():
+            print(name, benchmark.sweep)
+        return
+    data = run(args.cases, args.repeat, args.warmup, args.mintime,
+               parse_overrides(args.set),
+               log=partial(print, file=sys.stderr))
+    save(data, args.output)
+    if args.store is not None:
+        record(data, args.store)
+
+if __name__ == '__main__':
+    main()
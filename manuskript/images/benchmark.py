@@ -0,0 +1,223 @@
+"""Benchmark harness for the timing figures.
+
+A benchmark case is a generator function registered with the case()
+decorator. It receives the parameters of one point of the sweep as keyword
+arguments, prepares everything which should not be timed, yields the
+callable to be timed and may clean up after the yield. The keyword arguments
+of case() give the default sweep: a list or tuple is swept over, any other
+value is kept fixed.
+
+Expensive resources which can serve all points of a sweep, such as a warm
+process pool, are obtained by a case through shared_context(). Within
+run(), the first point enters the context and all later points with the
+same key reuse it, until the run is finished.
+
+run() times each point of the sweep after a number of warm-up calls and
+returns the medians together with a distribution-free confidence interval
+and some metadata on the machine, which save() writes as JSON. The figure
+scripts read these files with load() and series(), so that figures can be
+regenerated from new measurements and compared across machines.
+
+The cases used by the figures are registered in benchcases, which can also
+be run as a script.
+"""
+
+from collections import namedtuple
+from contextlib import ExitStack, contextmanager, nullcontext
+from datetime import datetime, timezone
+from importlib import metadata as package_metadata
+import inspect
+from itertools import product
+import json
+from math import comb
+import os
+import platform
+import time
+
+import numpy as np
+
+Case = namedtuple('Case', 'name setup sweep')
+
+CASES = {}
+
+def case(name, **sweep):
+    """Register the decorated generator function as benchmark case name."""
+    def register(func):
+        CASES[name] = Case(name, contextmanager(func), sweep)
+        return func
+    return register
+
+_shared = None
+
+@contextmanager
+def shared_contexts():
+    """Keep the contexts of shared_context() open until the block is left.
+
+    A nested block uses the contexts of the outermost one.
+    """
+    global _shared
+    if _shared is not None:
+        yield
+        return
+    with ExitStack() as stack:
+        _shared = (stack, {})
+        try:
+            yield
+        finally:
+            _shared = None
+
+def shared_context(key, factory):
+    """Return a context for the value of the context manager factory().
+
+    Within shared_contexts(), the context manager is entered only once for
+    each key and its value is reused by later calls. Otherwise, a new one is
+    entered and exited with the returned context.
+    """
+    if _shared is None:
+        return factory()
+    stack, values = _shared
+    if key not in values:
+        values[key] = stack.enter_context(factory())
+    return nullcontext(values[key])
+
+def parameters(sweep):
+    """Return a list of parameter dicts for all points of sweep."""
+    names = list(sweep)
+    values = [v if isinstance(v, (list, tuple)) else (v,)
+              for v in sweep.values()]
+    return [dict(zip(names, point)) for point in product(*values)]
+
+def measure(func, repeat=5, warmup=1, mintime=0.):
+    """Return the number of calls per repetition and the time per call.
+
+    The number of calls is doubled until one repetition takes at least
+    mintime seconds.
+    """
+    for _ in range(warmup):
+        func()
+    number = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(number):
+            func()
+        elapsed = time.perf_counter()-start
+        if elapsed >= mintime:
+            break
+        number = 2*number
+    times = [elapsed/number]
+    for _ in range(repeat-1):
+        start = time.perf_counter()
+        for _ in range(number):
+            func()
+        times.append((time.perf_counter()-start)/number)
+    return number, times
+
+def median_interval(times, confidence=0.95):
+    """Return a confidence interval for the median of times.
+
+    The interval is bounded by order statistics and does not assume a
+    particular distribution. For few repetitions, it covers the full range.
+    """
+    t = sorted(times)
+    n = len(t)
+    k = 0
+    tail = 1/2**n
+    while k+1 < n-1-k:
+        tail_next = tail+comb(n, k+1)/2**n
+        if 1-2*tail_next < confidence:
+            break
+        tail = tail_next
+        k = k+1
+    return t[k], t[n-1-k]
+
+def cpu_model():
+    """Return the name of the processor."""
+    try:
+        with open('/proc/cpuinfo') as fh:
+            for line in fh:
+                if line.startswith('model name'):
+                    return line.split(':', 1)[1].strip()
+    except OSError:
+        pass
+    return platform.processor() or platform.machine()
+
+def package_version(name):
+    try:
+        return package_metadata.version(name)
+    except package_metadata.PackageNotFoundError:
+        return None
+
+def machine_metadata():
+    """Return a description of the machine and the relevant packages."""
+    return {'cpu': cpu_model(),
+            'cpu_count': os.cpu_count(),
+            'node': platform.node(),
+            'platform': platform.platform(),
+            'python': platform.python_version(),
+            'numpy': np.__version__,
+            'numba': package_version('numba'),
+            'numexpr': package_version('numexpr'),
+            'date': datetime.now(timezone.utc).isoformat(timespec='seconds')}
+
+def run(names, repeat=5, warmup=1, mintime=0., overrides=None, log=None):
+    """Time the registered cases names and return the results.
+
+    overrides replaces entries of the default sweeps and applies to all cases
+    accepting the respective parameter. log, if given, is called with a line
+    of text after each measurement. The contexts of shared_context() are
+    closed at the end of the run.
+    """
+    with shared_contexts():
+        results = run_cases(names, repeat, warmup, mintime, overrides, log)
+    return {'metadata': machine_metadata(), 'results': results}
+
+def run_cases(names, repeat, warmup, mintime, overrides, log):
+    results = []
+    for name in names:
+        try:
+            benchmark = CASES[name]
+        except KeyError:
+            raise ValueError('unknown benchmark case {!r}'.format(name))
+        sweep = dict(benchmark.sweep)
+        accepted = inspect.signature(benchmark.setup).parameters
+        sweep.update((k, v) for k, v in (overrides or {}).items()
+                     if k in accepted)
+        for params in parameters(sweep):
+            with benchmark.setup(**params) as func:
+                number, times = measure(func, repeat, warmup, mintime)
+            median = float(np.median(times))
+            results.append({'case': name,
+                            'params': params,
+                            'number': number,
+                            'times': times,
+                            'median': median,
+                            'ci': median_interval(times)})
+            if log is not None:
+                log('{} {} {:.6g}'.format(name, params, median))
+    return results
+
+def save(data, filename):
+    with open(filename, 'w') as fh:
+        json.dump(data, fh, indent=1)
+
+def load(filename):
+    with open(filename) as fh:
+        return json.load(fh)
+
+def series(data, name, x=None, **fixed):
+    """Return the medians of case name as a list of (x, median) pairs.
+
+    Only results whose parameters agree with fixed are taken into account.
+    If x is None, the list contains the medians only.
+    """
+    points = []
+    for result in data['results']:
+        params = result['params']
+        if result['case'] != name or any(params.get(k) != v
+                                         for k, v in fixed.items()):
+            continue
+        if x is None:
+            points.append(result['median'])
+        else:
+            points.append((params[x], result['median']))
+    return points
@@ -0,0 +1,157 @@
+"""Append-only store of benchmark runs for tracking performance regressions.
+
+Each line of the store is the JSON result of benchmark.run() extended by the
+git revision of the working tree and a fingerprint of the machine. Runs are
+only compared with runs on the same machine. For every case and parameter
+set, the times of all runs of a revision are pooled, and a slowdown is
+flagged if the median grew by more than a threshold and a one-sided
+Mann-Whitney test finds the difference significant.
+
+Runs are recorded by benchcases.py with the option --store. The comparison
+is done by running this module as a script, e.g.
+
+    python benchstore.py HEAD~1 HEAD
+"""
+
+import argparse
+import hashlib
+from functools import lru_cache
+import json
+import math
+import os
+import subprocess
+import sys
+
+import numpy as np
+
+from benchmark import machine_metadata
+
+DEFAULT_STORE = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                             'benchmarks.jsonl')
+
+def git(*args):
+    try:
+        return subprocess.run(('git',)+args, capture_output=True, text=True,
+                              check=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))
+                              ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def revision():
+    """Return the current git revision, marked with + if there are changes."""
+    rev = git('rev-parse', 'HEAD')
+    if rev is not None and git('status', '--porcelain', '--untracked-files=no'):
+        rev = rev+'+'
+    return rev
+
+def fingerprint(metadata):
+    """Return a short hash identifying the machine described by metadata."""
+    machine = [metadata[k] for k in ('cpu', 'cpu_count', 'node', 'platform')]
+    return hashlib.sha256(repr(machine).encode('utf-8')).hexdigest()[:12]
+
+def record(data, store=DEFAULT_STORE):
+    """Append the benchmark results data to store."""
+    entry = dict(data, revision=revision(),
+                 fingerprint=fingerprint(data['metadata']))
+    with open(store, 'a') as fh:
+        fh.write(json.dumps(entry)+'\n')
+
+def runs(store=DEFAULT_STORE):
+    with open(store) as fh:
+        return [json.loads(line) for line in fh if line.strip()]
+
+def resolve(rev):
+    """Return the full revision for rev, keeping a trailing + for changes."""
+    dirty = rev.endswith('+')
+    full = git('rev-parse', '--verify', '--quiet', rev.rstrip('+')+'^{commit}')
+    return (full or rev.rstrip('+'))+('+' if dirty else '')
+
+def pooled_times(entries, rev):
+    """Return the times of all runs of rev, keyed on case and parameters."""
+    times = {}
+    for entry in entries:
+        if entry['revision'] is None or not entry['revision'].startswith(rev):
+            continue
+        if rev.endswith('+') != entry['revision'].endswith('+'):
+            continue
+        for result in entry['results']:
+            key = (result['case'],
+                   json.dumps(result['params'], sort_keys=True))
+            times.setdefault(key, []).extend(result['times'])
+    return times
+
+@lru_cache(maxsize=None)
+def u_counts(m, n):
+    """Return the number of orderings for each value of the U statistic."""
+    if m == 0 or n == 0:
+        counts = np.zeros(m*n+1)
+        counts[0] = 1
+        return counts
+    counts = np.zeros(m*n+1)
+    counts[n:] += u_counts(m-1, n)
+    counts[:m*(n-1)+1] += u_counts(m, n-1)
+    return counts
+
+def mann_whitney_greater(x, y):
+    """Return the p-value for values in x being larger than those in y.
+
+    For small samples, the exact distribution of U is used, otherwise its
+    normal approximation.
+    """
+    m, n = len(x), len(y)
+    u = sum((xi > yi)+0.5*(xi == yi) for xi in x for yi in y)
+    if m*n <= 400:
+        counts = u_counts(m, n)
+        return counts[int(np.ceil(u)):].sum()/counts.sum()
+    mean = m*n/2
+    sigma = np.sqrt(m*n*(m+n+1)/12)
+    return 0.5*math.erfc((u-0.5-mean)/(sigma*np.sqrt(2)))
+
+def compare(old, new, store=DEFAULT_STORE, machine=None, threshold=0.05,
+            alpha=0.05):
+    """Compare the runs of revision new with those of revision old.
+
+    Returns a list of (case, params, old median, new median, ratio, p-value,
+    slower) for all cases measured in both revisions on the given machine,
+    by default the current one.
+    """
+    if machine is None:
+        machine = fingerprint(machine_metadata())
+    entries = [e for e in runs(store) if e['fingerprint'] == machine]
+    old_times = pooled_times(entries, resolve(old))
+    new_times = pooled_times(entries, resolve(new))
+    rows = []
+    for key in sorted(old_times.keys() & new_times.keys()):
+        t_old = np.median(old_times[key])
+        t_new = np.median(new_times[key])
+        p = mann_whitney_greater(new_times[key], old_times[key])
+        rows.append(key+(t_old, t_new, t_new/t_old, p,
+                         t_new/t_old > 1+threshold and p < alpha))
+    return rows
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description='Compare benchmark runs of two revisions.')
+    parser.add_argument('old')
+    parser.add_argument('new', nargs='?', default='HEAD')
+    parser.add_argument('--store', default=DEFAULT_STORE)
+    parser.add_argument('--machine', help='fingerprint of the machine')
+    parser.add_argument('--threshold', type=float, default=0.05,
+                        help='relative slowdown to be tolerated')
+    parser.add_argument('--alpha', type=float, default=0.05,
+                        help='significance level')
+    args = parser.parse_args(argv)
+    rows = compare(args.old, args.new, args.store, args.machine,
+                   args.threshold, args.alpha)
+    if not rows:
+        print('no common benchmarks for these revisions on this machine')
+        return 0
+    for name, params, t_old, t_new, ratio, p, slower in rows:
+        print('{:20} {:40} {:10.4g} {:10.4g} {:6.3f} {:6.3f} {}'.format(
+              name, params, t_old, t_new, ratio, p,
+              'SLOWER' if slower else ''))
+    return 1 if any(row[-1] for row in rows) else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,246 @@
+"""Evaluation of array expressions by the fastest available backend.
+
+evaluate() computes an expression given as a string, like numexpr does,
+but chooses between plain NumPy, numexpr and a ufunc compiled by Numba
+according to the size of the arrays. NumPy has the least overhead and wins
+for small arrays, while numexpr and Numba avoid temporary arrays and can
+use several cores, which pays off for large ones. The backends are timed
+once per machine for a range of array sizes by calibrate(), and the
+timings are stored next to the result cache. An expression is then
+evaluated by the backend which was fastest for its array size.
+
+Expressions with a single operation are always left to NumPy, which does
+not create temporaries for them anyway. Expressions with functions unknown
+to numexpr, which only supports a part of the functions in FUNCTIONS, or
+with attributes or method calls are computed by NumPy or Numba.
+
+The Numba ufuncs are generated as source files in the cache directory, so
+that Numba can cache their compiled code on disk as well.
+"""
+
+import ast
+from bisect import bisect_right
+from functools import lru_cache
+import hashlib
+import importlib.util
+import json
+import os
+import sys
+import time
+
+import numpy as np
+
+from resultcache import default_directory
+
+try:
+    import numexpr
+except ImportError:
+    numexpr = None
+
+BACKENDS = ('numpy', 'numexpr', 'numba')
+FUNCTIONS = ('abs', 'arccos', 'arccosh', 'arcsin', 'arcsinh', 'arctan',
+             'arctan2', 'arctanh', 'ceil', 'conj', 'cos', 'cosh', 'exp',
+             'expm1', 'floor', 'imag', 'log', 'log10', 'log1p', 'log2',
+             'maximum', 'minimum', 'real', 'sin', 'sinh', 'sqrt', 'tan',
+             'tanh', 'where')
+# functions provided by numexpr since its early versions
+NUMEXPR_FUNCTIONS = ('abs', 'arccos', 'arccosh', 'arcsin', 'arcsinh', 'arctan',
+                     'arctan2', 'arctanh', 'conj', 'cos', 'cosh', 'exp',
+                     'expm1', 'imag', 'log', 'log10', 'log1p', 'real', 'sin',
+                     'sinh', 'sqrt', 'tan', 'tanh', 'where')
+CONSTANTS = ('e', 'pi')
+CALIBRATION_EXPR = '5*x**3-2*x**2+x-7'
+
+_namespace = {name: getattr(np, name) for name in FUNCTIONS+CONSTANTS}
+_compiled = {}
+_ufuncs = {}
+_calibration = None
+
+class Expression:
+    """Parsed expression with the information needed to dispatch it."""
+
+    def __init__(self, expr):
+        self.expr = expr
+        tree = ast.parse(expr, mode='eval')
+        self.code = compile(tree, '<expression>', 'eval')
+        names = {node.id for node in ast.walk(tree)
+                 if isinstance(node, ast.Name)}
+        calls = {node.func.id for node in ast.walk(tree)
+                 if isinstance(node, ast.Call)
+                 and isinstance(node.func, ast.Name)}
+        self.functions = calls
+        self.variables = sorted(names-calls-set(CONSTANTS))
+        self.operations = sum(isinstance(node, (ast.BinOp, ast.UnaryOp,
+                                                ast.Call, ast.Compare))
+                              for node in ast.walk(tree))
+        methods = any(isinstance(node, ast.Attribute)
+                      for node in ast.walk(tree))
+        self.numexpr_compatible = (calls <= set(NUMEXPR_FUNCTIONS)
+                                   and not methods)
+
+def parse(expr):
+    if expr not in _compiled:
+        _compiled[expr] = Expression(expr)
+    return _compiled[expr]
+
+def evaluate_numpy(expression, arrays):
+    return eval(expression.code, dict(_namespace), dict(arrays))
+
+def evaluate_numexpr(expression, arrays):
+    local_dict = {name: _namespace[name] for name in CONSTANTS}
+    local_dict.update((name, arrays[name]) for name in expression.variables)
+    return numexpr.evaluate(expression.expr, local_dict=local_dict)
+
+def numba_ufunc(expression, arrays):
+    """Return a parallel Numba ufunc for expression and the types of arrays.
+
+    The ufunc is written as a module to the cache directory and imported
+    from there, so that its compiled code is cached by Numba.
+    """
+    args = [np.asarray(arrays[name]) for name in expression.variables]
+    sample = evaluate_numpy(expression, {name: a.reshape(-1)[:1]
+                                         for name, a in zip(
+                                             expression.variables, args)})
+    signature = '{}({})'.format(np.asarray(sample).dtype.name,
+                                ', '.join(a.dtype.name for a in args))
+    key = (expression.expr, signature)
+    if key not in _ufuncs:
+        digest = hashlib.sha256(repr(key).encode('utf-8')).hexdigest()[:16]
+        name = 'expression_{}'.format(digest)
+        directory = os.path.join(default_directory(), 'expressions')
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, name+'.py')
+        if not os.path.exists(path):
+            source = ('from numba import njit, vectorize\n'
+                      'from numpy import {}\n\n'
+                      '@njit\n'
+                      'def where(condition, x, y):\n'
+                      '    return x if condition else y\n\n'
+                      '@vectorize([{!r}], target="parallel", cache=True)\n'
+                      'def ufunc({}):\n'
+                      '    return {}\n').format(
+                          ', '.join(name for name in FUNCTIONS+CONSTANTS
+                                    if name != 'where'),
+                          signature, ', '.join(expression.variables),
+                          expression.expr)
+            tmpname = '{}.{}.tmp'.format(path, os.getpid())
+            with open(tmpname, 'w') as fh:
+                fh.write(source)
+            os.replace(tmpname, path)
+        spec = importlib.util.spec_from_file_location(name, path)
+        module = importlib.util.module_from_spec(spec)
+        # Numba looks up the module by name when loading cached code.
+        sys.modules[name] = module
+        spec.loader.exec_module(module)
+        _ufuncs[key] = module.ufunc
+    return _ufuncs[key]
+
+def evaluate_numba(expression, arrays):
+    return numba_ufunc(expression, arrays)(*[arrays[name] for name
+                                             in expression.variables])
+
+_evaluators = {'numpy': evaluate_numpy, 'numexpr': evaluate_numexpr,
+               'numba': evaluate_numba}
+
+@lru_cache(maxsize=None)
+def available_backends():
+    backends = ['numpy']
+    if numexpr is not None:
+        backends.append('numexpr')
+    if importlib.util.find_spec('numba') is not None:
+        backends.append('numba')
+    return tuple(backends)
+
+def calibration_file():
+    return os.path.join(default_directory(), 'expressions.json')
+
+def machine_key():
+    from benchmark import machine_metadata
+    from benchstore import fingerprint
+    return fingerprint(machine_metadata())
+
+def calibrate(sizes=None, repeat=5, save=True):
+    """Time the backends for the polynomial of the profiling chapter.
+
+    Returns a dictionary with the array sizes and, for each available
+    backend, the best of repeat times for each size.
+    """
+    if sizes is None:
+        sizes = [2**k for k in range(4, 23)]
+    expression = parse(CALIBRATION_EXPR)
+    times = {backend: [] for backend in available_backends()}
+    for size in sizes:
+        arrays = {'x': np.linspace(0, 1, size)}
+        for backend in times:
+            evaluator = _evaluators[backend]
+            evaluator(expression, arrays)
+            best = float('inf')
+            for _ in range(repeat):
+                start = time.perf_counter()
+                evaluator(expression, arrays)
+                best = min(best, time.perf_counter()-start)
+            times[backend].append(best)
+    calibration = {'sizes': list(sizes), 'times': times}
+    if save:
+        path = calibration_file()
+        try:
+            with open(path) as fh:
+                stored = json.load(fh)
+        except (OSError, ValueError):
+            stored = {}
+        stored[machine_key()] = calibration
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmpname = '{}.{}.tmp'.format(path, os.getpid())
+        with open(tmpname, 'w') as fh:
+            json.dump(stored, fh, indent=1)
+        os.replace(tmpname, path)
+    return calibration
+
+def calibration():
+    """Return the stored calibration for this machine, calibrating if needed."""
+    global _calibration
+    if _calibration is None:
+        try:
+            with open(calibration_file()) as fh:
+                _calibration = json.load(fh)[machine_key()]
+        except (OSError, ValueError, KeyError):
+            _calibration = calibrate()
+    return _calibration
+
+def choose_backend(expr, size):
+    """Return the name of the backend to be used for expr and size elements.
+
+    Among the backends able to evaluate expr and available now, the one
+    fastest for the largest calibrated size not exceeding size is chosen.
+    """
+    expression = parse(expr)
+    if expression.operations <= 1:
+        return 'numpy'
+    data = calibration()
+    index = max(bisect_right(data['sizes'], size)-1, 0)
+    available = available_backends()
+    candidates = [backend for backend in data['times']
+                  if backend in available
+                  and (backend != 'numexpr' or expression.numexpr_compatible)]
+    return min(candidates, key=lambda backend: data['times'][backend][index])
+
+def evaluate(expr, backend=None, **arrays):
+    """Evaluate expr for the given arrays, by default with the best backend.
+
+    The expression may use the operators of Python, the NumPy functions in
+    FUNCTIONS and the constants e and pi.
+    """
+    expression = parse(expr)
+    missing = set(expression.variables)-set(arrays)
+    if missing:
+        raise ValueError('no values for {}'.format(', '.join(sorted(missing))))
+    if backend is None:
+        size = max((np.size(a) for a in arrays.values()), default=1)
+        backend = choose_backend(expr, size)
+    elif backend not in BACKENDS:
+        raise ValueError('unknown backend {!r}, expected one of {}'
+                         .format(backend, ', '.join(BACKENDS)))
+    elif backend not in available_backends():
+        raise ValueError('backend {0!r} requires the package {0}, which is '
+                         'not installed'.format(backend))
+    return _evaluators[backend](expression, arrays)
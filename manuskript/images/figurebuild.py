@@ -0,0 +1,277 @@
+"""Incremental build of the figures produced by the scripts in images.
+
+The figure scripts are found in the subdirectories of this directory. Each
+script is run in a subprocess within its own directory under an audit hook
+(see trace()), which records the files opened for reading and writing as
+well as the helper modules imported from this directory. Files written by
+Ghostscript, which PyX calls for PNG output, are recognized from its
+-sOutputFile option.
+
+The inputs and outputs of each script are kept in a manifest together with
+the SHA-256 hashes of the inputs. A script is run again only if it has not
+been run successfully before, if the content of one of its inputs has
+changed or a missing input has appeared, or if one of its outputs is
+missing. Hashes are recomputed only for files whose size or modification
+time has changed.
+
+Scripts are run in parallel by a thread pool, where a script reading the
+output of another one waits until that one is done. The dependencies are
+taken from the manifest, so they are known from the second build on.
+Timing scripts, whose results depend on the machine and which run for
+minutes, are only built on request.
+"""
+
+import argparse
+from concurrent import futures
+import fnmatch
+import hashlib
+import json
+import os
+import runpy
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+MANIFEST = os.path.join(ROOT, '.figurebuild.json')
+TIMING = ('parallel/backend_timing.py', 'parallel/parallel_timing.py',
+          'profiling/profiling_timing.py')
+
+def relative(path):
+    """Return path relative to ROOT, or None if it lies outside of ROOT."""
+    path = os.path.relpath(os.path.abspath(path), ROOT)
+    if path.startswith(os.pardir) or '__pycache__' in path:
+        return None
+    return path.replace(os.sep, '/')
+
+def discover(exclude=TIMING):
+    """Return the figure scripts in the subdirectories of ROOT."""
+    scripts = []
+    for entry in sorted(os.listdir(ROOT)):
+        directory = os.path.join(ROOT, entry)
+        if not os.path.isdir(directory) or entry.startswith(('.', '_')):
+            continue
+        for name in sorted(os.listdir(directory)):
+            script = entry+'/'+name
+            if (name.endswith('.py')
+                    and not any(fnmatch.fnmatch(script, pattern)
+                                for pattern in exclude)):
+                scripts.append(script)
+    return scripts
+
+def trace(script, record):
+    """Run script as __main__ and write its inputs and outputs to record.
+
+    This is executed in the subprocess started by build_script().
+    """
+    inputs, outputs = set(), set()
+    writing = os.O_WRONLY | os.O_RDWR | os.O_APPEND | os.O_CREAT
+
+    def hook(event, args):
+        if event == 'open':
+            path, _, flags = args
+            if isinstance(path, (str, bytes, os.PathLike)):
+                path = relative(os.fsdecode(path))
+                if path is not None:
+                    (outputs if flags & writing else inputs).add(path)
+        elif event in ('os.rename', 'os.replace'):
+            path = relative(os.fsdecode(args[1]))
+            if path is not None:
+                outputs.add(path)
+        elif event == 'subprocess.Popen':
+            for arg in args[1] or ():
+                if isinstance(arg, str) and arg.startswith('-sOutputFile='):
+                    path = relative(arg[len('-sOutputFile='):])
+                    if path is not None:
+                        outputs.add(path)
+
+    path = os.path.abspath(script)
+    sys.argv = [os.path.basename(path)]
+    sys.path.insert(0, os.path.dirname(path))
+    sys.addaudithook(hook)
+    try:
+        runpy.run_path(path, run_name='__main__')
+    except SystemExit as e:
+        if e.code:
+            raise
+    for module in list(sys.modules.values()):
+        filename = getattr(module, '__file__', None)
+        if filename is not None and relative(filename) is not None:
+            inputs.add(relative(filename))
+    inputs.add(relative(path))
+    inputs.discard(relative(__file__))
+    with open(record, 'w') as fh:
+        json.dump({'inputs': sorted(inputs-outputs),
+                   'outputs': sorted(outputs)}, fh)
+
+class Manifest:
+    """Inputs and outputs of the scripts together with file hashes."""
+
+    def __init__(self, filename=MANIFEST):
+        self.filename = filename
+        try:
+            with open(filename) as fh:
+                data = json.load(fh)
+        except (OSError, ValueError):
+            data = {}
+        self.scripts = data.get('scripts', {})
+        self.files = data.get('files', {})
+
+    def digest(self, path):
+        """Return the SHA-256 hash of path, or None if it does not exist."""
+        try:
+            st = os.stat(os.path.join(ROOT, path))
+        except OSError:
+            return None
+        stamp = [st.st_mtime_ns, st.st_size]
+        entry = self.files.get(path)
+        if entry is None or entry[:2] != stamp:
+            h = hashlib.sha256()
+            with open(os.path.join(ROOT, path), 'rb') as fh:
+                for block in iter(lambda: fh.read(2**20), b''):
+                    h.update(block)
+            entry = stamp+[h.hexdigest()]
+            self.files[path] = entry
+        return entry[2]
+
+    def stale(self, script):
+        """Return the reason why script needs to be run, or None."""
+        entry = self.scripts.get(script)
+        if entry is None:
+            return 'never built'
+        for path, digest in sorted(entry['inputs'].items()):
+            if self.digest(path) != digest:
+                return path+' changed'
+        for path in entry['outputs']:
+            if not os.path.exists(os.path.join(ROOT, path)):
+                return path+' missing'
+        return None
+
+    def producers(self, script, scripts):
+        """Return the scripts whose outputs are read by script."""
+        entry = self.scripts.get(script)
+        if entry is None:
+            return set()
+        return {other for other in scripts if other != script
+                and other in self.scripts
+                and set(self.scripts[other]['outputs']) & set(entry['inputs'])}
+
+    def update(self, script, inputs, outputs):
+        # Missing inputs are kept with the digest None, so that the script
+        # is run again once they have been created.
+        self.scripts[script] = {
+            'inputs': {path: self.digest(path) for path in inputs},
+            'outputs': outputs}
+
+    def save(self):
+        tmpname = '{}.{}.tmp'.format(self.filename, os.getpid())
+        with open(tmpname, 'w') as fh:
+            json.dump({'scripts': self.scripts, 'files': self.files}, fh,
+                      indent=1, sort_keys=True)
+        os.replace(tmpname, self.filename)
+
+def build_script(script):
+    """Run script under trace() and return its exit status, output and record."""
+    fd, record = tempfile.mkstemp(suffix='.json')
+    os.close(fd)
+    env = dict(os.environ, MPLBACKEND='Agg')
+    try:
+        process = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), '--trace', record,
+             os.path.join(ROOT, script)],
+            cwd=os.path.dirname(os.path.join(ROOT, script)), env=env,
+            stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
+            universal_newlines=True)
+        result = None
+        if process.returncode == 0:
+            with open(record) as fh:
+                result = json.load(fh)
+        return process.returncode, process.stdout, result
+    finally:
+        os.unlink(record)
+
+def build(scripts=None, max_workers=None, force=False, dry_run=False,
+          log=print):
+    """Run the stale scripts and return the list of those which failed.
+
+    The manifest is saved after each script, so that an interrupted build
+    keeps its progress.
+    """
+    if scripts is None:
+        scripts = discover()
+    if max_workers is None:
+        max_workers = os.cpu_count()
+    manifest = Manifest()
+    pending = set(scripts)
+    depends = {script: manifest.producers(script, scripts)
+               for script in scripts}
+    running = {}
+    failed = []
+    with futures.ThreadPoolExecutor(max_workers) as pool:
+        while pending or running:
+            busy = pending | set(running.values())
+            ready = sorted(script for script in pending
+                           if not depends[script] & busy)
+            if not ready and not running:
+                # cyclic dependencies, run what is left regardless
+                ready = sorted(pending)
+            for script in ready:
+                pending.remove(script)
+                reason = 'forced' if force else manifest.stale(script)
+                if reason is None:
+                    continue
+                log('{:40} {}'.format(script, reason))
+                if not dry_run:
+                    running[pool.submit(build_script, script)] = script
+            if not running:
+                continue
+            done, _ = futures.wait(running,
+                                   return_when=futures.FIRST_COMPLETED)
+            for future in done:
+                script = running.pop(future)
+                returncode, output, result = future.result()
+                if returncode:
+                    failed.append(script)
+                    manifest.scripts.pop(script, None)
+                    log('{} failed with exit status {}:\n{}'.format(
+                        script, returncode, output))
+                else:
+                    manifest.update(script, result['inputs'],
+                                    result['outputs'])
+                    log('{:40} done, {} outputs'.format(
+                        script, len(result['outputs'])))
+                # the digests of rewritten files are out of date
+                for path in result['outputs'] if result else ():
+                    manifest.files.pop(path, None)
+                manifest.save()
+    if not dry_run:
+        manifest.save()
+    return failed
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description='Run the figure scripts whose inputs have changed.')
+    parser.add_argument('scripts', nargs='*',
+                        help='scripts relative to the images directory, '
+                             'by default all except the timing scripts')
+    parser.add_argument('-j', '--jobs', type=int,
+                        help='number of scripts run in parallel')
+    parser.add_argument('-f', '--force', action='store_true',
+                        help='run the scripts even if they are up to date')
+    parser.add_argument('-n', '--dry-run', action='store_true',
+                        help='only list the scripts which would be run')
+    parser.add_argument('--timing', action='store_true',
+                        help='include the timing scripts')
+    parser.add_argument('--trace', nargs=2, metavar=('RECORD', 'SCRIPT'),
+                        help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+    if args.trace is not None:
+        trace(args.trace[1], args.trace[0])
+        return 0
+    scripts = ([relative(script) or script for script in args.scripts]
+               or discover(() if args.timing else TIMING))
+    failed = build(scripts, args.jobs, args.force, args.dry_run)
+    return 1 if failed else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,68 @@
+"""Conversion of escape-time arrays into bitmaps without per-pixel loops.
+
+Values are mapped through a colour table by array indexing. The resulting
+RGB array can be shown by matplotlib's imshow() or embedded in a PyX canvas
+by pyx_bitmap(), so that PyX is only used for the annotations on top of the
+image.
+"""
+
+import numpy as np
+
+def colortable(colormap, size=256):
+    """Return a (size, 3) array of RGB values between 0 and 1.
+
+    colormap is either the name of a matplotlib colormap or a sequence of RGB
+    triples which are interpolated linearly.
+    """
+    t = np.linspace(0, 1, size)
+    if isinstance(colormap, str):
+        from matplotlib import colormaps
+        return colormaps[colormap](t)[:, :3]
+    stops = np.asarray(colormap, dtype=np.float64)
+    positions = np.linspace(0, 1, len(stops))
+    return np.stack([np.interp(t, positions, stops[:, k]) for k in range(3)],
+                    axis=-1)
+
+def colorize(values, colormap='gray', vmin=None, vmax=None, mask=None,
+             maskcolor=(0, 0, 0), size=256):
+    """Map values through a colormap to an RGB array of dtype uint8.
+
+    Values are scaled linearly from vmin to vmax, which default to the
+    extreme values outside of mask. Points where mask is true obtain
+    maskcolor.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    if mask is None:
+        mask = np.zeros(values.shape, dtype=bool)
+    outside = values[~mask]
+    if vmin is None:
+        vmin = outside.min() if outside.size else 0
+    if vmax is None:
+        vmax = outside.max() if outside.size else 1
+    scale = (values-vmin)/(vmax-vmin) if vmax > vmin else np.zeros_like(values)
+    index = np.rint(np.clip(scale, 0, 1)*(size-1)).astype(np.intp)
+    table = np.rint(colortable(colormap, size)*255).astype(np.uint8)
+    rgb = table[index]
+    rgb[mask] = np.rint(np.asarray(maskcolor)*255).astype(np.uint8)
+    return rgb
+
+def escape_colors(data, nitermax, colormap='twilight_shifted', log=True,
+                  maskcolor=(0, 0, 0)):
+    """Colour escape times, possibly smooth ones, with the interior in maskcolor.
+
+    With log true, the colours follow the logarithm of the escape time, which
+    resolves both the fast and the slow escaping regions.
+    """
+    data = np.asarray(data, dtype=np.float64)
+    mask = data >= nitermax-1
+    values = np.log1p(np.maximum(data, 0)) if log else data
+    return colorize(values, colormap, mask=mask, maskcolor=maskcolor)
+
+def pyx_bitmap(rgb, xpos, ypos, width, height):
+    """Return a PyX bitmap of an RGB array with its lower left corner at
+    (xpos, ypos). As usual for images, the first row is at the top.
+    """
+    from pyx import bitmap
+    rgb = np.ascontiguousarray(rgb, dtype=np.uint8)
+    image = bitmap.image(rgb.shape[1], rgb.shape[0], 'RGB', rgb.tobytes())
+    return bitmap.bitmap(xpos, ypos, image, width=width, height=height)
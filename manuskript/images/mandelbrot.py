@@ -0,0 +1,575 @@
+"""Escape-time engine shared by the Mandelbrot figure scripts.
+
+The iteration only works on the pixels which have not yet escaped. Their
+positions are kept in a compacted index array, so that the work per
+iteration shrinks as pixels escape, and the loop ends as soon as no pixel
+is left. Points in the main cardioid and in the period-2 bulb are known not
+to escape and are removed before the iteration starts. Optionally, orbits
+which have become periodic are detected by Brent's method and removed as
+well.
+
+For the process pool, mandelbrot_dynamic() starts from a coarse grid of tiles
+and splits tiles which turn out to be expensive into four sub-tiles on the fly,
+so that idle workers can be fed from a common queue without having to guess a
+good subdivision in advance.
+
+With SharedArrays, the coordinate grids and the output image are placed in
+shared memory. Workers then read and write their region in place and only
+tile indices have to be pickled.
+
+The process-pool functions accept an executor, e.g. a workerpool.WarmPool,
+so that one pool can be reused for many renders. Otherwise, a new pool with
+max_workers processes is created for each call.
+
+mandelbrot_set() and render() offer a common interface to all engines, which
+are selected by one of the names in BACKENDS. The Numba kernels live in
+mandelbrot_numba and are only imported when needed.
+
+The precision is chosen according to the pixel spacing of the viewport by
+precision(). Coarse viewports are computed in single precision, finer ones
+in double precision, and beyond that with integers scaled by a power of
+two, which Python allows to be arbitrarily long.
+
+Images too large for the main memory are rendered by render_to_file(), which
+writes each finished tile into a memory-mapped .npy file and keeps a record
+of the finished tiles, so that an interrupted render can be resumed.
+
+mandelbrot_set() can take the tiles of an image from a resultcache.ResultCache
+on disk. KERNEL_VERSION is part of the cache key and has to be increased
+whenever a change of the kernels modifies their results.
+"""
+
+from collections import deque
+from concurrent import futures
+from contextlib import ExitStack
+from fractions import Fraction
+from functools import partial
+from multiprocessing import shared_memory
+import os
+
+import numpy as np
+
+from resultcache import ResultCache
+from workerpool import worker_pool
+
+KERNEL_VERSION = 2
+
+def interior(cx, cy):
+    """Return a mask of the points in the main cardioid or the period-2 bulb."""
+    xq = cx-0.25
+    q = xq*xq+cy*cy
+    return (q*(q+xq) <= 0.25*cy*cy) | ((cx+1)*(cx+1)+cy*cy <= 0.0625)
+
+def escape_time(cx, cy, nitermax, periodicity=False, smooth=False):
+    """Return the last iteration before escape for each point c = cx+i*cy.
+
+    As in the original masking version, a point which escapes in iteration
+    n obtains the value n-1, while points which do not escape obtain the
+    value nitermax-1. cx and cy may be any two arrays broadcastable to a
+    common shape, e.g. as obtained from np.ogrid or np.mgrid.
+
+    If periodicity is true, the current value of z is saved in iterations
+    1, 2, 4, 8, ... and a point is taken not to escape as soon as z returns
+    to the saved value within a few units of the floating point resolution.
+
+    If smooth is true, a float array is returned where an escaping point
+    obtains the continuous value n-log2(log2(|z|)) instead of n-1, so that
+    colours do not change in steps.
+    """
+    cx, cy = np.broadcast_arrays(cx, cy)
+    shape = cx.shape
+    dtype = np.result_type(cx, cy, np.float32)
+    ax = cx.astype(dtype).ravel()
+    ay = cy.astype(dtype).ravel()
+    data = np.full(ax.size, nitermax-1,
+                   dtype=np.float64 if smooth else np.int64)
+    active = np.flatnonzero(~interior(ax, ay))
+    ax, ay = ax[active], ay[active]
+    x = np.zeros_like(ax)
+    y = np.zeros_like(ay)
+    if periodicity:
+        tol = 16*np.finfo(dtype).eps
+        xs = np.full_like(ax, np.nan)
+        ys = np.full_like(ay, np.nan)
+        checkpoint = 1
+    for n in range(nitermax):
+        if not active.size:
+            break
+        x2 = x*x
+        y2 = y*y
+        notdone = x2+y2 < 4
+        if not notdone.all():
+            escaped = ~notdone
+            if smooth:
+                r2 = (x2[escaped]+y2[escaped]).astype(np.float64)
+                data[active[escaped]] = n-np.log2(0.5*np.log2(r2))
+            else:
+                data[active[escaped]] = n-1
+        if periodicity:
+            notdone &= ~((np.abs(x-xs) <= tol) & (np.abs(y-ys) <= tol))
+        if not notdone.all():
+            active = active[notdone]
+            x, y, x2, y2 = x[notdone], y[notdone], x2[notdone], y2[notdone]
+            ax, ay = ax[notdone], ay[notdone]
+            if periodicity:
+                xs, ys = xs[notdone], ys[notdone]
+        if periodicity and n == checkpoint:
+            xs, ys = x, y
+            checkpoint = 2*checkpoint
+        x, y = x2-y2+ax, 2*x*y+ay
+    return data.reshape(shape)
+
+def escape_time_fixed(cx, cy, nitermax, bits):
+    """Like escape_time(), but for integers scaled by 2**bits.
+
+    cx and cy are expected to be object arrays of Python integers as
+    obtained from fixed_grid().
+    """
+    cx, cy = np.broadcast_arrays(cx, cy)
+    shape = cx.shape
+    ax = cx.ravel()
+    ay = cy.ravel()
+    data = np.full(ax.size, nitermax-1, dtype=np.int64)
+    active = np.arange(ax.size)
+    four = 4 << bits
+    x = np.zeros(ax.size, dtype=object)
+    y = np.zeros(ay.size, dtype=object)
+    for n in range(nitermax):
+        if not active.size:
+            break
+        x2 = (x*x) >> bits
+        y2 = (y*y) >> bits
+        notdone = x2+y2 < four
+        if not notdone.all():
+            data[active[~notdone]] = n-1
+            active = active[notdone]
+            x, y, x2, y2 = x[notdone], y[notdone], x2[notdone], y2[notdone]
+            ax, ay = ax[notdone], ay[notdone]
+        x, y = x2-y2+ax, ((x*y) >> (bits-1))+ay
+    return data.reshape(shape)
+
+def result_dtype(options):
+    """Return the dtype of the escape times for the options of escape_time()."""
+    return np.float64 if options.get('smooth', False) else np.int64
+
+def pixel_spacing(xmin, xmax, ymin, ymax, npts):
+    """Return the smaller pixel spacing of a viewport as a Fraction."""
+    xmin, xmax, ymin, ymax = (Fraction(v) for v in (xmin, xmax, ymin, ymax))
+    return min(abs(xmax-xmin), abs(ymax-ymin))/(npts-1)
+
+def precision(xmin, xmax, ymin, ymax, npts, safety=1000):
+    """Return the precision needed to resolve the pixels of a viewport.
+
+    The result is 'float32' or 'float64' if the pixel spacing exceeds the
+    resolution of the respective type at the largest coordinate by the factor
+    safety, and 'arbitrary' otherwise.
+    """
+    spacing = pixel_spacing(xmin, xmax, ymin, ymax, npts)
+    magnitude = max([2]+[abs(Fraction(v)) for v in (xmin, xmax, ymin, ymax)])
+    for dtype in ('float32', 'float64'):
+        if spacing > safety*Fraction(float(np.finfo(dtype).eps))*magnitude:
+            return dtype
+    return 'arbitrary'
+
+def fixed_grid(xmin, xmax, ymin, ymax, npts, guard=32):
+    """Return cy, cx as from np.ogrid as integers scaled by 2**bits, and bits.
+
+    The bounds may be given as strings or fractions, so that they are not
+    limited by the precision of a float. The number of bits resolves the
+    pixel spacing with guard additional bits.
+    """
+    spacing = pixel_spacing(xmin, xmax, ymin, ymax, npts)
+    bits = int(1/spacing).bit_length()+guard
+
+    def axis(vmin, vmax):
+        vmin = Fraction(vmin)
+        vmax = Fraction(vmax)
+        return np.array([round((vmin+(vmax-vmin)*n/(npts-1))*2**bits)
+                         for n in range(npts)], dtype=object)
+
+    return axis(ymin, ymax)[:, np.newaxis], axis(xmin, xmax), bits
+
+def mandelbrot_tile(nitermax, nx, ny, cx, cy):
+    """Compute the tile with indices (nx, ny) as used by the tiled renderers."""
+    return (nx, ny, escape_time(cx, cy, nitermax))
+
+def estimated_cost(cx, cy, nitermax, stride=8):
+    """Estimate the number of iterations needed for a tile from a subsample.
+
+    Points inside the main cardioid or the period-2 bulb do not contribute.
+    """
+    sx = cx[::stride, ::stride]
+    sy = cy[::stride, ::stride]
+    sample = escape_time(sx, sy, nitermax)
+    sample[interior(sx, sy)] = -1
+    return (sample.sum()+sample.size)*cx.size/sample.size
+
+def dynamic_tile(nitermax, maxcost, minlen, options, tile, cx, cy):
+    """Compute a tile unless it is too expensive and may still be split.
+
+    In the latter case, None is returned instead of the data. The options
+    are passed on to escape_time().
+    """
+    if (min(cx.shape) >= 2*minlen
+            and estimated_cost(cx, cy, nitermax) > maxcost):
+        return (tile, None)
+    return (tile, escape_time(cx, cy, nitermax, **options))
+
+def split_tile(tile):
+    """Split the tile (i0, i1, j0, j1) into four quadrants."""
+    i0, i1, j0, j1 = tile
+    im = (i0+i1)//2
+    jm = (j0+j1)//2
+    return [(i0, im, j0, jm), (i0, im, jm, j1),
+            (im, i1, j0, jm), (im, i1, jm, j1)]
+
+def coarse_tiles(shape, ndiv):
+    """Divide an array of the given shape into ndiv x ndiv tiles."""
+    ibounds = np.linspace(0, shape[0], ndiv+1).astype(int)
+    jbounds = np.linspace(0, shape[1], ndiv+1).astype(int)
+    return [(ibounds[nx], ibounds[nx+1], jbounds[ny], jbounds[ny+1])
+            for nx in range(ndiv) for ny in range(ndiv)]
+
+class SharedArrays:
+    """Copies of arrays in shared memory which workers can attach to by name.
+
+    The attribute specs describes the arrays and is all that needs to be
+    passed to a worker, which obtains the arrays by attach_shared(specs).
+    """
+
+    def __init__(self, *arrays):
+        self.blocks = []
+        self.arrays = []
+        for a in arrays:
+            shm = shared_memory.SharedMemory(create=True, size=max(a.nbytes, 1))
+            self.blocks.append(shm)
+            b = np.ndarray(a.shape, a.dtype, buffer=shm.buf)
+            b[...] = a
+            self.arrays.append(b)
+        self.specs = tuple((shm.name, a.shape, a.dtype.str)
+                           for shm, a in zip(self.blocks, self.arrays))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def close(self):
+        del self.arrays[:]
+        for shm in self.blocks:
+            shm.close()
+            shm.unlink()
+        del self.blocks[:]
+
+_attached = []
+
+def attach_shared(specs):
+    """Return the arrays described by specs, attaching to them on first use.
+
+    A worker stays attached to the arrays of the most recent specs only, so
+    that long-lived workers do not keep old blocks alive.
+    """
+    if not _attached or _attached[0] != specs:
+        if _attached:
+            del _attached[2][:]
+            for shm in _attached[1]:
+                shm.close()
+            del _attached[:]
+        blocks = [shared_memory.SharedMemory(name=name)
+                  for name, _, _ in specs]
+        arrays = [np.ndarray(shape, dtype, buffer=shm.buf)
+                  for shm, (_, shape, dtype) in zip(blocks, specs)]
+        _attached.extend([specs, blocks, arrays])
+    return _attached[2]
+
+def shared_tile(nitermax, options, specs, tile):
+    """Compute a tile in place in the shared output image."""
+    cx, cy, data = attach_shared(specs)
+    i0, i1, j0, j1 = tile
+    data[i0:i1, j0:j1] = escape_time(cx[i0:i1, j0:j1], cy[i0:i1, j0:j1],
+                                     nitermax, **options)
+    return tile
+
+def shared_dynamic_tile(nitermax, maxcost, minlen, options, specs, tile):
+    """Like dynamic_tile(), but in place in the shared output image.
+
+    True is returned instead of the data if the tile was computed.
+    """
+    cx, cy, data = attach_shared(specs)
+    i0, i1, j0, j1 = tile
+    tile, result = dynamic_tile(nitermax, maxcost, minlen, options, tile,
+                                cx[i0:i1, j0:j1], cy[i0:i1, j0:j1])
+    if result is None:
+        return (tile, None)
+    data[i0:i1, j0:j1] = result
+    return (tile, True)
+
+def mandelbrot_shared(cx, cy, nitermax, ndiv, max_workers=4, executor=None,
+                      **options):
+    """Compute the escape times on a process pool with a static grid of tiles.
+
+    The grids and the output image are kept in shared memory. The options
+    are passed on to escape_time().
+    """
+    cx, cy = np.broadcast_arrays(cx, cy)
+    data = np.zeros(cx.shape, dtype=result_dtype(options))
+    with SharedArrays(cx, cy, data) as shared:
+        worker = partial(shared_tile, nitermax, options, shared.specs)
+        with worker_pool(executor, max_workers) as pool:
+            for tile in pool.map(worker, coarse_tiles(cx.shape, ndiv)):
+                pass
+        data = shared.arrays[2].copy()
+    return data
+
+def mandelbrot_dynamic(cx, cy, nitermax, ndiv=2, max_workers=4,
+                       minlen=16, maxcost=None, shared=False, executor=None,
+                       **options):
+    """Compute the escape times on a process pool with dynamic tiling.
+
+    Starting from ndiv x ndiv tiles, every tile whose estimated cost exceeds
+    maxcost is split into four sub-tiles, as long as its sides are not
+    shorter than 2*minlen. By default, maxcost corresponds to a fraction
+    1/(16*max_workers) of the cost of a grid which lies completely inside
+    the Mandelbrot set. Sub-tiles are put at the front of the queue, and at
+    most two tasks per worker are in flight at any time, so that idle workers
+    always obtain the next tile from the queue. If shared is true, the grids
+    and the output image are kept in shared memory. The remaining options
+    are passed on to escape_time().
+    """
+    cx, cy = np.broadcast_arrays(cx, cy)
+    if maxcost is None:
+        maxcost = nitermax*cx.size/(16*max_workers)
+    data = np.zeros(cx.shape, dtype=result_dtype(options))
+    if shared:
+        with SharedArrays(cx, cy, data) as sharedarrays:
+            worker = partial(shared_dynamic_tile, nitermax, maxcost, minlen,
+                             options, sharedarrays.specs)
+            schedule_tiles(worker, lambda tile: (tile,),
+                           lambda tile, result: None,
+                           coarse_tiles(cx.shape, ndiv), max_workers, executor)
+            data = sharedarrays.arrays[2].copy()
+        return data
+
+    def submit_args(tile):
+        i0, i1, j0, j1 = tile
+        return (tile, cx[i0:i1, j0:j1], cy[i0:i1, j0:j1])
+
+    def store(tile, result):
+        i0, i1, j0, j1 = tile
+        data[i0:i1, j0:j1] = result
+
+    schedule_tiles(partial(dynamic_tile, nitermax, maxcost, minlen, options),
+                   submit_args, store, coarse_tiles(cx.shape, ndiv),
+                   max_workers, executor)
+    return data
+
+def schedule_tiles(worker, submit_args, store, tiles, max_workers, executor):
+    """Run worker for a queue of tiles and store the results.
+
+    worker is called with the arguments returned by submit_args(tile) and
+    returns the tile together with its result, which is passed to store().
+    Tiles for which the result is None are split and put back in front of
+    the queue. At most two tasks per worker are in flight at any time.
+    """
+    queue = deque(tiles)
+    pending = set()
+    with worker_pool(executor, max_workers) as pool:
+        while queue or pending:
+            while queue and len(pending) < 2*max_workers:
+                pending.add(pool.submit(worker,
+                                        *submit_args(queue.popleft())))
+            done, pending = futures.wait(pending,
+                                         return_when=futures.FIRST_COMPLETED)
+            for f in done:
+                tile, result = f.result()
+                if result is None:
+                    queue.extendleft(reversed(split_tile(tile)))
+                else:
+                    store(tile, result)
+
+BACKENDS = ('numpy', 'numba-serial', 'numba-parallel', 'process-pool')
+
+def render(cx, cy, nitermax, backend='numpy', **options):
+    """Compute the escape times for the grids cx and cy with the given backend.
+
+    The options are passed on to escape_time() for the numpy backend and to
+    mandelbrot_dynamic() for the process-pool backend, which keeps the data in
+    shared memory unless shared=False is given and passes the remaining
+    options on to escape_time() in the workers. The Numba kernels always work
+    in double precision and only support the periodicity option, so that a
+    ValueError is raised for any other option which is set.
+    """
+    if backend == 'numpy':
+        return escape_time(cx, cy, nitermax, **options)
+    if backend == 'process-pool':
+        options.setdefault('shared', True)
+        return mandelbrot_dynamic(cx, cy, nitermax, **options)
+    if backend in ('numba-serial', 'numba-parallel'):
+        periodicity = options.pop('periodicity', False)
+        unsupported = sorted(name for name, value in options.items() if value)
+        if unsupported:
+            raise ValueError('backend %r does not support %s'
+                             % (backend, ', '.join(unsupported)))
+        import mandelbrot_numba
+        if backend == 'numba-serial':
+            kernel = mandelbrot_numba.escape_time_serial
+        else:
+            kernel = mandelbrot_numba.escape_time_parallel
+        cx, cy = np.broadcast_arrays(np.asarray(cx, dtype=np.float64),
+                                     np.asarray(cy, dtype=np.float64))
+        return kernel(cx, cy, nitermax, bool(periodicity))
+    raise ValueError('unknown backend %r, expected one of %s'
+                     % (backend, ', '.join(BACKENDS)))
+
+def mandelbrot_set(xmin, xmax, ymin, ymax, npts, nitermax, backend='numpy',
+                   dtype=None, cache=None, tilesize=256, **options):
+    """Compute the escape times on an npts x npts grid with the given backend.
+
+    By default, dtype is chosen by precision(). For 'arbitrary', the escape
+    times are computed by escape_time_fixed() and the bounds may be given as
+    strings or fractions. As this kernel only runs in the main process and
+    supports none of the options, a ValueError is raised for any other
+    backend than numpy or for options which are set.
+
+    If cache is a ResultCache, or True for the default one, the image is
+    assembled from tiles of tilesize x tilesize pixels. Tiles found in the
+    cache are reused, also from other viewports containing exactly the same
+    tile, while the missing ones are computed one after the other and stored.
+    Apart from periodicity and smooth, the options do not enter the cache
+    key, as they do not affect the result. For the process-pool backend, a
+    single pool is started for all missing tiles unless an executor is given.
+    """
+    if cache is True:
+        cache = ResultCache()
+    if dtype is None:
+        dtype = precision(xmin, xmax, ymin, ymax, npts)
+    periodicity = options.get('periodicity', False)
+    smooth = options.get('smooth', False)
+    if dtype == 'arbitrary':
+        if backend != 'numpy':
+            raise ValueError('backend %r does not support arbitrary precision'
+                             % backend)
+        unsupported = sorted(name for name, value in options.items() if value)
+        if unsupported:
+            raise ValueError('arbitrary precision does not support %s'
+                             % ', '.join(unsupported))
+        if cache is not None:
+            key = cache.key('mandelbrot', KERNEL_VERSION, 'fixed',
+                            str(xmin), str(xmax), str(ymin), str(ymax),
+                            npts, nitermax)
+            data = cache.get(key)
+            if data is not None:
+                return data
+        cy, cx, bits = fixed_grid(xmin, xmax, ymin, ymax, npts)
+        data = escape_time_fixed(cx, cy, nitermax, bits)
+        if cache is not None:
+            cache.put(key, data)
+        return data
+    xmin, xmax, ymin, ymax = (float(v) for v in (xmin, xmax, ymin, ymax))
+    cy, cx = np.mgrid[ymin:ymax:npts*1j, xmin:xmax:npts*1j]
+    cx = cx.astype(dtype)
+    cy = cy.astype(dtype)
+    if cache is None:
+        return render(cx, cy, nitermax, backend, **options)
+    if backend.startswith('numba'):
+        kernel = ('numba', 'float64', periodicity)
+    else:
+        kernel = ('numpy', str(np.dtype(dtype)), periodicity, smooth)
+    data = np.empty(cx.shape, dtype=result_dtype(options))
+    bounds = list(range(0, npts, tilesize))+[npts]
+    with ExitStack() as stack:
+        for i0, i1 in zip(bounds[:-1], bounds[1:]):
+            for j0, j1 in zip(bounds[:-1], bounds[1:]):
+                tx = cx[i0:i1, j0:j1]
+                ty = cy[i0:i1, j0:j1]
+                key = cache.key('mandelbrot', KERNEL_VERSION, kernel,
+                                nitermax, tx.shape,
+                                float(tx[0, 0]), float(tx[-1, -1]),
+                                float(ty[0, 0]), float(ty[-1, -1]))
+                tile = cache.get(key)
+                if tile is None:
+                    if (backend == 'process-pool'
+                            and options.get('executor') is None):
+                        # one pool for all missing tiles
+                        options['executor'] = stack.enter_context(
+                            worker_pool(None, options.get('max_workers', 4)))
+                    tile = render(tx, ty, nitermax, backend, **options)
+                    cache.put(key, tile)
+                data[i0:i1, j0:j1] = tile
+    return data
+
+def stream_tile(nitermax, options, tile, x, y):
+    """Compute the tile of the grid spanned by the axis sections x and y."""
+    return (tile, escape_time(x[np.newaxis, :], y[:, np.newaxis], nitermax,
+                              **options))
+
+def render_to_file(filename, xmin, xmax, ymin, ymax, npts, nitermax,
+                   tilesize=1024, dtype=None, resume=True,
+                   max_workers=4, executor=None, **options):
+    """Render an npts x npts image tile by tile into the .npy file filename.
+
+    The file is memory-mapped, so that only the tiles currently being computed
+    are kept in memory. Each tile is flushed to disk as soon as it is finished
+    and then recorded in filename+'.tiles'. The partial image can be inspected
+    at any time by np.load(filename, mmap_mode='r'), where the missing tiles
+    are zero. If resume is true and both files exist, the recorded tiles are
+    skipped, provided that the parameters of the render, including the
+    precision and the options, agree. The options are passed on to
+    escape_time(). By default, the image has the dtype of its escape times,
+    and a ValueError is raised for a dtype which cannot hold them. The
+    memory-mapped image is returned.
+    """
+    prec = precision(xmin, xmax, ymin, ymax, npts)
+    if prec == 'arbitrary':
+        raise ValueError('the viewport requires more than double precision')
+    if dtype is None:
+        dtype = result_dtype(options)
+    dtype = np.dtype(dtype)
+    if (not np.can_cast(result_dtype(options), dtype, 'same_kind')
+            or dtype.kind in 'iu' and np.iinfo(dtype).max < nitermax-1):
+        raise ValueError('dtype %s cannot hold the escape times' % dtype)
+    header = '# %r %r %r %r %d %d %s %r\n' % (
+        float(xmin), float(xmax), float(ymin), float(ymax), npts, nitermax,
+        prec, sorted((k, v) for k, v in options.items() if v))
+    logname = filename+'.tiles'
+    done = set()
+    if resume and os.path.exists(filename) and os.path.exists(logname):
+        with open(logname) as fh:
+            if fh.readline() != header:
+                raise ValueError('%s belongs to a render with different '
+                                 'parameters' % filename)
+            done = set(tuple(int(v) for v in line.split()) for line in fh)
+        data = np.lib.format.open_memmap(filename, mode='r+')
+        if data.shape != (npts, npts) or data.dtype != dtype:
+            raise ValueError('%s has the wrong shape or dtype' % filename)
+        log = open(logname, 'a')
+    else:
+        data = np.lib.format.open_memmap(filename, mode='w+', dtype=dtype,
+                                         shape=(npts, npts))
+        log = open(logname, 'w')
+        log.write(header)
+        log.flush()
+    x = np.linspace(float(xmin), float(xmax), npts).astype(prec)
+    y = np.linspace(float(ymin), float(ymax), npts).astype(prec)
+    bounds = list(range(0, npts, tilesize))+[npts]
+    tiles = [(i0, i1, j0, j1)
+             for i0, i1 in zip(bounds[:-1], bounds[1:])
+             for j0, j1 in zip(bounds[:-1], bounds[1:])
+             if (i0, i1, j0, j1) not in done]
+
+    def submit_args(tile):
+        i0, i1, j0, j1 = tile
+        return (tile, x[j0:j1], y[i0:i1])
+
+    def store(tile, result):
+        i0, i1, j0, j1 = tile
+        data[i0:i1, j0:j1] = result
+        data.flush()
+        log.write('%d %d %d %d\n' % tile)
+        log.flush()
+
+    with log:
+        schedule_tiles(partial(stream_tile, nitermax, options), submit_args,
+                       store, tiles, max_workers, executor)
+    return data
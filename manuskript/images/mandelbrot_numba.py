@@ -0,0 +1,53 @@
+"""Numba kernels for the Mandelbrot engine.
+
+The kernels follow the Numba section of the manuscript: a compiled scalar
+iteration is wrapped by guvectorize, once for a single thread and once with
+target='parallel'. As in the NumPy engine, points in the main cardioid and
+in the period-2 bulb are recognized without iterating, and periodic orbits
+are optionally detected by Brent's method. All kernels are cached on disk, so
+that only the very first import pays for the compilation.
+"""
+
+import math
+import sys
+
+from numba import boolean, float64, guvectorize, int64, njit
+
+TOL = 16*sys.float_info.epsilon
+
+@njit(cache=True)
+def mandelbrot_iteration(cx, cy, nitermax, periodicity):
+    xq = cx-0.25
+    q = xq*xq+cy*cy
+    if q*(q+xq) <= 0.25*cy*cy or (cx+1)*(cx+1)+cy*cy <= 0.0625:
+        return nitermax-1
+    x = 0.
+    y = 0.
+    xs = math.nan
+    ys = math.nan
+    checkpoint = 1
+    for n in range(nitermax):
+        x2 = x*x
+        y2 = y*y
+        if x2+y2 >= 4:
+            return n-1
+        if periodicity:
+            if abs(x-xs) <= TOL and abs(y-ys) <= TOL:
+                return nitermax-1
+            if n == checkpoint:
+                xs = x
+                ys = y
+                checkpoint = 2*checkpoint
+        x, y = x2-y2+cx, 2*x*y+cy
+    return nitermax-1
+
+def _escape_time(cx, cy, nitermax, periodicity, output):
+    for i in range(cx.shape[0]):
+        output[i] = mandelbrot_iteration(cx[i], cy[i], nitermax, periodicity)
+
+_signatures = [(float64[:], float64[:], int64, boolean, int64[:])]
+_layout = '(n),(n),(),()->(n)'
+escape_time_serial = guvectorize(_signatures, _layout,
+                                 cache=True)(_escape_time)
+escape_time_parallel = guvectorize(_signatures, _layout, target='parallel',
+                                   cache=True)(_escape_time)
@@ -1,9 +1,14 @@
 from itertools import product
 from math import atan2, pi, sqrt
+import os
+import sys
 
 from pyx import canvas, color, deco, path, text, trafo, unit
 
-text.set(text.LatexRunner)
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from textcache import CachedEngine
+
+text.set(CachedEngine)
 text.preamble(r'\usepackage{arev}\usepackage[T1]{fontenc}')
 unit.set(xscale=1.2, wscale=1.5)
 
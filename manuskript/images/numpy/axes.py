@@ -1,6 +1,12 @@
+import os
+import sys
+
 from pyx import canvas, color, deco, path, text, trafo, unit
 
-text.set(text.LatexRunner)
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from textcache import CachedEngine
+
+text.set(CachedEngine)
 color0 = color.rgb(0.8, 0, 0)
 color1 = color.rgb(0, 0, 0.8)
 text.preamble(r'\usepackage{arev}\usepackage[T1]{fontenc}')
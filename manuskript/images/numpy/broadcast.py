@@ -1,5 +1,11 @@
+import os
+import sys
+
 from pyx import canvas, color, deco, path, text, style, trafo, unit
 
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from textcache import CachedEngine
+
 def drawgrid(c, nxcells, nycells, yoff, gridcolor=color.grey(0), arange=None):
     c.stroke(path.rect(0, yoff, nxcells, nycells), [gridcolor])
     for nx in range(nxcells-1):
@@ -46,7 +52,7 @@ def array34(arange, hlshape=None):
     return c
 
 
-text.set(text.LatexRunner)
+text.set(CachedEngine)
 text.preamble(r'\usepackage{arev}\usepackage[T1]{fontenc}')
 unit.set(xscale=1.2, wscale=1.5)
 
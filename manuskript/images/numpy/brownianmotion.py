@@ -1,21 +1,25 @@
-import numpy as np
+import os
+import sys
+
 import matplotlib.pyplot as plt
 
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from randomwalk import random_walk
+
 stories = 50
 length = 10000
-jumps = np.random.choice(np.array([-1, 1]), size=(length, stories))
-trajectories = np.cumsum(jumps, axis=0)
+walk = random_walk(stories, length, keep=stories)
 plt.xlabel('$t$', fontsize=20)
 plt.ylabel('$x$', fontsize=20)
-plt.plot(trajectories)
+plt.plot(walk.times, walk.trajectories)
 plt.savefig('brownianmotion1.png')
 plt.clf()
 plt.xlabel('$t$', fontsize=20)
 plt.ylabel(r'$\langle x\rangle$', fontsize=20)
-plt.plot(np.mean(trajectories, axis=1))
+plt.plot(walk.times, walk.mean)
 plt.savefig('brownianmotion2.png')
 plt.clf()
 plt.xlabel('$t$', fontsize=20)
 plt.ylabel(r'$\langle x^2\rangle-\langle x\rangle^2$', fontsize=20)
-plt.plot(np.var(trajectories, axis=1))
+plt.plot(walk.times, walk.var)
 plt.savefig('brownianmotion3.png')
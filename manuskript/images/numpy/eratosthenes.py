@@ -4,13 +4,16 @@ import sys
 import numpy as np
 from pyx import canvas, color, path, text, trafo, unit
 
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from textcache import CachedEngine
+
 def draw_grid():
     c.stroke(path.rect(0, 0, 25, 2))
     for n in range(24):
         c.stroke(path.line(n+1, 0, n+1, 2))
     c.stroke(path.line(0, 1, 25, 1))
 
-text.set(text.LatexRunner)
+text.set(CachedEngine)
 text.preamble(r'\usepackage{arev}\usepackage[T1]{fontenc}')
 unit.set(xscale=1.2, wscale=2.5)
 
@@ -1,14 +1,15 @@
-import numpy as np
+import os
+import sys
+
 import matplotlib.pyplot as plt
 
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from mandelbrot import mandelbrot_set
+
 niter = 2000
 npts = 1000
-y, x = np.ogrid[-1.5:1.5:npts*1j, -2:1:npts*1j]
-c = x+1j*y
-z = c
-for n in range(niter):
-    z = z**2+c
-imdata = np.abs(z) < 2
+imdata = mandelbrot_set(-2, 1, -1.5, 1.5, npts, niter, cache=True,
+                        periodicity=True) == niter-1
 plt.imshow(imdata, extent=(-2, 1, -1.5, 1.5),
            cmap='gray', interpolation='none')
 plt.xlabel('$\mathrm{Re}(c)$', fontsize=20)
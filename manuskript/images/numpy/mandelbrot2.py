@@ -1,22 +1,22 @@
-import numpy as np
+import os
+import sys
+
 import matplotlib.pyplot as plt
 
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from imageexport import escape_colors
+from mandelbrot import mandelbrot_set
+
 niter = 200
 npts = 1000
 xmin = -0.68
 xmax = -0.66
 ymin = 0.45
 ymax = 0.47
-y, x = np.ogrid[ymax:ymin:npts*1j, xmin:xmax:npts*1j]
-c = x+1j*y
-z = np.zeros_like(c)
-output = np.zeros(c.shape, dtype=np.int)
-for n in range(niter):
-    notdone = np.abs(z) < 2
-    output[notdone] = n
-    z[notdone] = z[notdone]**2+c[notdone]
-plt.imshow(output, extent=(xmin, xmax, ymin, ymax),
-           cmap='Paired', interpolation='none')
+output = mandelbrot_set(xmin, xmax, ymax, ymin, npts, niter, cache=True,
+                        smooth=True)
+plt.imshow(escape_colors(output, niter, colormap='Paired', log=False),
+           extent=(xmin, xmax, ymin, ymax), interpolation='none')
 plt.xlabel('$\mathrm{Re}(c)$', fontsize=20)
 plt.ylabel('$\mathrm{Im}(c)$', fontsize=20)
 plt.savefig('mandelbrot2.png')
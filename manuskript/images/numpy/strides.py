@@ -3,6 +3,9 @@ import os.path
 
 from pyx import canvas, color, deco, path, text, trafo, unit
 
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from textcache import CachedEngine
+
 def make_stride_figure(lowerstride, uperstride=1, nrentries=6):
     c = canvas.canvas()
     ht = 0.5
@@ -35,7 +38,7 @@ def make_stride_figure(lowerstride, uperstride=1, nrentries=6):
                    [text.halign.center, text.valign.top, textcolor])
     return c
 
-text.set(text.LatexRunner)
+text.set(CachedEngine)
 text.preamble(r'\usepackage{arev}\usepackage[T1]{fontenc}\usepackage{amsmath}')
 unit.set(xscale=1.2, wscale=1.5)
 
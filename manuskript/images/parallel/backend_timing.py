@@ -0,0 +1,28 @@
+import os
+import sys
+import time
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from mandelbrot import BACKENDS, mandelbrot_set
+from workerpool import WarmPool
+
+nitermax = 2000
+npts = 1024
+xmin = -2
+xmax = 1
+ymin = -1.5
+ymax = 1.5
+backends = sys.argv[1:] or BACKENDS
+
+with WarmPool(max_workers=4, modules=('numpy', 'mandelbrot')) as pool:
+    for backend in backends:
+        options = {'executor': pool} if backend == 'process-pool' else {}
+        # all backends work on the same double precision grid as the Numba
+        # kernels, which only exist for float64
+        options['dtype'] = 'float64'
+        # compile or load the Numba kernels outside of the timed region
+        mandelbrot_set(xmin, xmax, ymin, ymax, 16, 10, backend, **options)
+        start = time.time()
+        data = mandelbrot_set(xmin, xmax, ymin, ymax, npts, nitermax,
+                              backend, **options)
+        print(backend, time.time()-start)
@@ -2,15 +2,18 @@ from concurrent import futures
 from functools import partial
 from itertools import product
 import os
+import sys
+
 import numpy as np
 from pyx import color, deco, graph, path
 
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from imageexport import colorize, pyx_bitmap
+from mandelbrot import escape_time
+
 def mandelbrot_iteration(niter, *args):
-    nx, ny, c = args[0]
-    z = np.zeros_like(c)
-    for n in range(niter):
-        z = z**2+c
-    return nx, ny, os.getpid(), np.abs(z) < 2
+    nx, ny, cx, cy = args[0]
+    return nx, ny, os.getpid(), escape_time(cx, cy, niter) == niter-1
 
 npts = 1024
 xmin = -2
@@ -21,43 +24,44 @@ ymax = 1.5
 height = npts
 niter = 2000
 
-y, x = np.ogrid[ymin:ymax:height*1j, xmin:xmax:width*1j]
-c = x+1j*y
+cy, cx = np.mgrid[ymin:ymax:height*1j, xmin:xmax:width*1j]
 
 nexponent = 2
 n = 2**nexponent
 nlen = npts//n
 clist = []
 for nx, ny in product(range(n), repeat=2):
-    clist.append((nx, ny, c[nx*nlen:(nx+1)*nlen, ny*nlen:(ny+1)*nlen]))
+    clist.append((nx, ny,
+                  cx[nx*nlen:(nx+1)*nlen, ny*nlen:(ny+1)*nlen],
+                  cy[nx*nlen:(nx+1)*nlen, ny*nlen:(ny+1)*nlen]))
 ex = futures.ProcessPoolExecutor(max_workers=4)
 results = list(ex.map(partial(mandelbrot_iteration, niter), clist))
 
-data = []
+inset = np.zeros(cx.shape, dtype=bool)
 procdict = {}
 for r in results:
     nx, ny, procid, partialdata = r
-    for mx, my in product(range(nlen), repeat=2):
-        cval = c[nx*nlen+mx, ny*nlen+my]
-        data.append((cval.real, cval.imag, partialdata[mx, my]))
+    inset[nx*nlen:(nx+1)*nlen, ny*nlen:(ny+1)*nlen] = partialdata
     procdict[(nx, ny)] = procid
 procids = set(procdict.values())
 colors = [color.hsb(n/(len(procids)-1)*0.67, 1, 1) for n in range(len(procids))]
 proccolors = dict(zip(procids, colors))
 
 g = graph.graphxy(width=8, height=8,
-        x=graph.axis.lin(),
-        y=graph.axis.lin())
-g.plot(graph.data.points(data, x=1, y=2, color=3),
-       [graph.style.density(keygraph=None)])
+        x=graph.axis.lin(min=xmin, max=xmax),
+        y=graph.axis.lin(min=ymin, max=ymax))
+xll, yll = g.pos(xmin, ymin)
+xur, yur = g.pos(xmax, ymax)
+g.insert(pyx_bitmap(colorize(inset[::-1], [(1, 1, 1), (0, 0, 0)]),
+                    xll, yll, xur-xll, yur-yll))
 
 dx = (xmax-xmin)/n
 dy = (ymax-ymin)/n
 for k, v in procdict.items():
     nx, ny = k
     tilecolor = proccolors[v]
-    xll, yll = g.pos(xmin+dx*nx, ymin+dy*ny)
-    xur, yur = g.pos(xmin+dx*(nx+1), ymin+dy*(ny+1))
+    xll, yll = g.pos(xmin+dx*ny, ymin+dy*nx)
+    xur, yur = g.pos(xmin+dx*(ny+1), ymin+dy*(nx+1))
     g.fill(path.rect(xll, yll, xur-xll, yur-yll),
            [deco.stroked([color.grey(0)]), tilecolor, color.transparency(0.5)])
 g.writePDFfile()
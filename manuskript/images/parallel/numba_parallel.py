@@ -1,15 +1,19 @@
+import os
+import sys
+
 from pyx import color, deco, graph, style
 
-with open('numba_parallel.dat') as fh:
-    t_cpu = float(fh.readline().rstrip('\n').split()[1])
-    t_parallel = []
-    for _ in range(8):
-        elems = fh.readline().rstrip('\n').split()
-        t_parallel.append((int(elems[0]), float(elems[1])))
-t_parallel = [(n, t_cpu/t) for n, t in t_parallel]
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from benchmark import load, series
+
+results = load('numba_parallel.json')
+t_cpu, = series(results, 'zeta-cpu')
+t_parallel = [(n, t_cpu/t) for n, t in series(results, 'zeta-parallel',
+                                                 'threads')]
 
 g = graph.graphxy(width=8,
-        x=graph.axis.linear(min=1, max=8, title="Zahl der Threads"),
+        x=graph.axis.linear(min=1, max=max(n for n, _ in t_parallel),
+                             title="Zahl der Threads"),
         y=graph.axis.linear(title="Beschleunigung"))
 g.plot(graph.data.points(t_parallel, x=1, y=2),
        [graph.style.line([style.linestyle.dotted]),
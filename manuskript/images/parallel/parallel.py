@@ -1,45 +1,31 @@
-from concurrent import futures
 from functools import partial
 from itertools import product
 import os
+import sys
 import time
 
 import numpy as np
-from pyx import canvas, color, deco, path, text, unit
+from pyx import canvas, path, text, unit
 
-def mandelbrot_tile(nitermax, nx, ny, cx, cy):
-    start = time.time()
-    x = np.zeros_like(cx)
-    y = np.zeros_like(cx)
-    data = np.zeros(cx.shape, dtype=np.int)
-    for n in range(nitermax):
-        x2 = x*x
-        y2 = y*y
-        notdone = x2+y2 < 4
-        data[notdone] = n
-        x[notdone], y[notdone] = (x2[notdone]-y2[notdone]+cx[notdone],
-                                  2*x[notdone]*y[notdone]+cy[notdone])
-    ende = time.time()
-    return (nx, ny, os.getpid(), start, ende, data)
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from mandelbrot import mandelbrot_tile
+from textcache import CachedEngine
+from tracing import TracingExecutor, draw_timeline
+from workerpool import WarmPool
 
 def mandelbrot(xmin, xmax, width, ymin, ymax, height,
-               npts, ndiv, niter, max_workers=4):
+               npts, ndiv, niter, executor):
     y, x = np.mgrid[ymin:ymax:height*1j, xmin:xmax:width*1j]
     nlen = npts//ndiv
     clist = [(nx, ny,
               x[nx*nlen:(nx+1)*nlen, ny*nlen:(ny+1)*nlen],
               y[nx*nlen:(nx+1)*nlen, ny*nlen:(ny+1)*nlen])
              for nx, ny in product(range(ndiv), repeat=2)]
+    tracer = TracingExecutor(executor)
     start = time.time()
-    ex = futures.ProcessPoolExecutor(max_workers=max_workers)
-    wait_for = [ex.submit(partial(mandelbrot_tile, niter), nx, ny, cx, cy)
-                for (nx, ny, cx, cy) in clist]
-    results = [f.result()[0:5] for f in futures.as_completed(wait_for)]
+    list(tracer.map(partial(mandelbrot_tile, niter), *zip(*clist)))
     ende = time.time()
-    processids = sorted(set([r[2] for r in results]))
-    processdict = dict(zip(processids, range(len(processids))))
-    return (len(processdict), start, ende,
-            [(processdict[r[2]], r[3]-start, r[4]-start) for r in results])
+    return start, ende, tracer.events
 
 npts = 1024
 xmin = -2
@@ -50,25 +36,24 @@ ymax = 1.5
 height = npts
 niter = 2000
 
+text.set(CachedEngine, base=text.TexEngine)
 cnvs = canvas.canvas()
 unit.set(wscale=0.8)
 cellheight = 0.17
 
-for nr, ndiv in enumerate((2, 4, 8, 16, 32)):
-    nrproc, start, ende, data = mandelbrot(xmin, xmax, width, ymin, ymax, height,
-                      npts, ndiv, niter)
-    offset = -(nrproc+1.2)*cellheight*nr
-    cnvs.text(-0.2, offset+2*cellheight, "$n=%s$" % ndiv,
-              [text.halign.right, text.valign.middle])
-    cnvs.stroke(path.line(0, -0.2*cellheight+offset, 0,
-        (nrproc+0.2)*cellheight+offset))
-    cnvs.stroke(path.line(ende-start, -0.2*cellheight+offset, ende-start,
-        (nrproc+0.2)*cellheight+offset))
-    for d in data:
-        colours = color.hsb(0.667*d[0]/(nrproc-1), 1, 0.3)
-        colourf = color.hsb(0.667*d[0]/(nrproc-1), 0.2, 1)
-        cnvs.stroke(path.rect(d[1], d[0]*cellheight+offset, (d[2]-d[1]), 0.8*cellheight),
-                [colours, deco.filled([colourf])])
+with WarmPool(max_workers=4, modules=('numpy', 'mandelbrot')) as pool:
+    for nr, ndiv in enumerate((2, 4, 8, 16, 32)):
+        start, ende, events = mandelbrot(xmin, xmax, width, ymin, ymax, height,
+                                         npts, ndiv, niter, pool)
+        nrproc = len(pool.pids)
+        offset = -(nrproc+1.2)*cellheight*nr
+        cnvs.text(-0.2, offset+2*cellheight, "$n=%s$" % ndiv,
+                  [text.halign.right, text.valign.middle])
+        cnvs.stroke(path.line(0, -0.2*cellheight+offset, 0,
+            (nrproc+0.2)*cellheight+offset))
+        cnvs.stroke(path.line(ende-start, -0.2*cellheight+offset, ende-start,
+            (nrproc+0.2)*cellheight+offset))
+        draw_timeline(cnvs, events, start, offset, cellheight)
 
 cnvs.writePDFfile()
 cnvs.writeGSfile(device="png16m", resolution=600)
@@ -1,18 +1,19 @@
+import os
+import sys
+
 from pyx import color, deco, graph, style
 
-cpus = ['i7-3770', 'i5-4690']
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from benchmark import load, series
+
+cpus = sys.argv[1:] or ['i7-3770', 'i5-4690']
 data = {}
 for cpu in cpus:
-    data[cpu] = []
-    with open(cpu+'.dat') as fh:
-        for line in fh:
-            nr, t1, t4 = line.rstrip('\n').split()
-            nr = int(nr)
-            t1 = float(t1)
-            t4 = float(t4)
-            data[cpu].append((t1, t4))
-    data[cpu] = [(2**nr, data[cpu][0][0]/t4, t1/t4)
-                 for nr, (t1, t4) in enumerate(data[cpu])]
+    results = load(cpu+'.json')
+    t1 = dict(series(results, 'mandelbrot-single', 'ndiv'))
+    t4 = dict(series(results, 'mandelbrot-pool', 'ndiv'))
+    data[cpu] = [(ndiv, t1[1]/t4[ndiv], t1[ndiv]/t4[ndiv])
+                 for ndiv in sorted(t4)]
 
 logparter = graph.axis.parter.log(tickpreexps=
                 [graph.axis.parter.preexp([graph.axis.tick.rational(1, 1)], 2)])
@@ -22,15 +23,16 @@ g = graph.graphxy(width=8,
         y=graph.axis.lin(min=0, title='Beschleunigung'),
         key=graph.key.key(pos="tl"))
 for nr, cpu in enumerate(cpus):
+    grey = color.grey(nr/max(len(cpus)-1, 1))
     g.plot(graph.data.points(data[cpu], x=1, y=2, title=cpu),
             [graph.style.line(lineattrs=[style.linestyle.dotted]),
              graph.style.symbol(symbol=graph.style.symbol.circle,
-    	         size=0.1, symbolattrs=[deco.filled([color.grey(nr)])])
+    	         size=0.1, symbolattrs=[deco.filled([grey])])
 	    ])
     g.plot(graph.data.points(data[cpu], x=1, y=3, title=cpu),
             [graph.style.line(lineattrs=[style.linestyle.solid]),
              graph.style.symbol(symbol=graph.style.symbol.circle,
-		 size=0.1, symbolattrs=[deco.filled([color.grey(nr)])])
+		 size=0.1, symbolattrs=[deco.filled([grey])])
             ])
 g.writePDFfile()
 g.writeGSfile(device="png16m", resolution=600)
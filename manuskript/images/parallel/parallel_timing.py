@@ -1,63 +1,26 @@
-from concurrent import futures
-from itertools import product
-from functools import partial
-import time
+import argparse
+import os
+import sys
 
-import numpy as np
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+import benchcases
+from benchmark import run, save
 
-def mandelbrot_tile(nitermax, nx, ny, cx, cy):
-    x = np.zeros_like(cx)
-    y = np.zeros_like(cx)
-    data = np.zeros(cx.shape, dtype=np.int)
-    for n in range(nitermax):
-        x2 = x*x
-        y2 = y*y
-        notdone = x2+y2 < 4
-        data[notdone] = n
-        x[notdone], y[notdone] = (x2[notdone]-y2[notdone]+cx[notdone],
-                                  2*x[notdone]*y[notdone]+cy[notdone])
-    return (nx, ny, data)
+parser = argparse.ArgumentParser(
+    description='Time the Mandelbrot process pool for parallel_time.py.')
+parser.add_argument('--schedule', default='static',
+                    choices=('static', 'dynamic'))
+parser.add_argument('--shared', action='store_true',
+                    help='keep the grids and the image in shared memory')
+parser.add_argument('-o', '--output', default='parallel_timing',
+                    help='name of the results, e.g. the CPU model i7-3770, '
+                         'which is passed to parallel_time.py')
+args = parser.parse_args()
 
-def mandelbrot(xmin, xmax, ymin, ymax, npts, nitermax, ndiv, max_workers=4):
-    start = time.time()
-    cy, cx = np.mgrid[ymin:ymax:npts*1j, xmin:xmax:npts*1j]
-    nlen = npts//ndiv
-    paramlist = [(nx, ny,
-                  cx[nx*nlen:(nx+1)*nlen, ny*nlen:(ny+1)*nlen],
-                  cy[nx*nlen:(nx+1)*nlen, ny*nlen:(ny+1)*nlen])
-                 for nx, ny in product(range(ndiv), repeat=2)]
-    with futures.ProcessPoolExecutor(max_workers=max_workers) as executors:
-        wait_for = [executors.submit(partial(mandelbrot_tile, nitermax),
-                                             nx, ny, cx, cy)
-                    for (nx, ny, cx, cy) in paramlist]
-        results = [f.result() for f in futures.as_completed(wait_for)]
-    data = np.zeros(cx.shape, dtype=np.int)
-    for nx, ny, result in results:
-        data[nx*nlen:(nx+1)*nlen, ny*nlen:(ny+1)*nlen] = result
-    return time.time()-start
-
-def mandelbrot_single(xmin, xmax, ymin, ymax, npts, nitermax, ndiv):
-    start = time.time()
-    cy, cx = np.mgrid[ymin:ymax:npts*1j, xmin:xmax:npts*1j]
-    nlen = npts//ndiv
-    paramlist = [(nx, ny,
-                  cx[nx*nlen:(nx+1)*nlen, ny*nlen:(ny+1)*nlen],
-                  cy[nx*nlen:(nx+1)*nlen, ny*nlen:(ny+1)*nlen])
-                 for nx, ny in product(range(ndiv), repeat=2)]
-    data = np.zeros(cx.shape, dtype=np.int)
-    for nx, ny, cx, cy in paramlist:
-        nx, ny, result = mandelbrot_tile(nitermax, nx, ny, cx, cy)
-        data[nx*nlen:(nx+1)*nlen, ny*nlen:(ny+1)*nlen] = result
-    return time.time()-start
-
-nitermax = 2000
-npts = 1024
-xmin = -2
-xmax = 1
-ymin = -1.5
-ymax = 1.5
-
-for ndiv in (1, 2, 4, 8, 16, 32, 64, 128,):
-    t1 = mandelbrot_single(xmin, xmax, ymin, ymax, npts, nitermax, ndiv)
-    t4 = mandelbrot(xmin, xmax, ymin, ymax, npts, nitermax, ndiv)
-    print(ndiv, t1, t4)
+data = run(['mandelbrot-single', 'mandelbrot-pool'], repeat=3,
+           overrides={'schedule': args.schedule, 'shared': args.shared},
+           log=print)
+filename = args.output+'.json'
+save(data, filename)
+print('results written to', filename)
+print('plot them by python parallel_time.py', args.output)
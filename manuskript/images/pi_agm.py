@@ -0,0 +1,69 @@
+"""Digits of pi by the Gauss-Legendre algorithm as in the profiling chapter.
+
+The functions are those of the example script pi.py, so that its running
+time can be tracked by the benchmarks.
+"""
+
+from math import sqrt
+import sys
+
+def division(numerator, denominator, stellen):
+    resultat = str(numerator//denominator)+"."
+    for n in range(stellen):
+        numerator = (numerator % denominator)*10
+        resultat = "%s%s" % (resultat, numerator//denominator)
+    return resultat
+
+def wurzel_startwert(quadrat):
+    """bestimme näherungsweise die Wurzel aus einem langen Integer
+
+       Es wird die Wurzel auf der Basis der ersten 12 oder 13 Stellen
+       mit Hilfe des entsprechenden Floats gezogen.
+    """
+    str_quadrat = str(quadrat)
+    nrdigits = len(str_quadrat)
+    keepdigits = 12
+    if nrdigits % 2:
+        keepdigits = keepdigits+1
+    lead_sqrt_estimate = sqrt(float(str_quadrat[:keepdigits]))
+    return int(lead_sqrt_estimate)*10**((nrdigits-keepdigits)//2)+1
+
+def wurzel(quadrat):
+    x = wurzel_startwert(quadrat)
+    xold = 0
+    while x != xold:
+        xold = x
+        x = (x*x+quadrat)//(2*x)
+    return x
+
+def agm_iteration(a, b):
+    return (a+b)//2, wurzel(a*b)
+
+def pi_digits(stellen):
+    """Return pi with stellen digits after the decimal point as a string.
+
+    wurzel_startwert() converts integers of about 2*stellen digits to
+    strings, so the limit of this conversion is lifted during the call.
+    """
+    if not hasattr(sys, 'set_int_max_str_digits'):
+        return _pi_digits(stellen)
+    limit = sys.get_int_max_str_digits()
+    sys.set_int_max_str_digits(0)
+    try:
+        return _pi_digits(stellen)
+    finally:
+        sys.set_int_max_str_digits(limit)
+
+def _pi_digits(stellen):
+    skalenfaktor = 10**(stellen+6)
+    a = skalenfaktor
+    b = wurzel(skalenfaktor**2//2)
+    c_sum = 0
+    faktor_two = 2
+    while a != b:
+        a, b = agm_iteration(a, b)
+        faktor_two = faktor_two*2
+        c_sum = c_sum+faktor_two*(a*a-b*b)
+    numerator = 4*a**2
+    denominator = skalenfaktor**2-c_sum
+    return division(numerator, denominator, stellen)
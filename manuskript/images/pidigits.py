@@ -0,0 +1,107 @@
+"""Fast computation of many digits of pi with long integers.
+
+The example of the profiling chapter (see pi_agm) spends its time in two
+places: every square root starts Newton's method from a float estimate and
+iterates at full precision, and the decimal expansion is produced one digit
+at a time, which is quadratic in the number of digits. Here, square roots
+are taken by math.isqrt, which doubles the precision of its Newton iterates
+in each step so that only the final step works at full precision. The
+digits are obtained by a single integer division scaled by a power of ten
+and one conversion to a string. Very long integers are converted by
+divide and conquer, since str() is quadratic as well.
+
+Besides the Gauss-Legendre algorithm, which is computed in binary fixed
+point arithmetic, the Chudnovsky series is available, summed by binary
+splitting. If gmpy2 is installed, its integers are used, which are much
+faster for millions of digits.
+"""
+
+from math import log2
+import math
+
+try:
+    import gmpy2
+except ImportError:
+    gmpy2 = None
+
+if gmpy2 is None:
+    mpz = int
+    isqrt = math.isqrt
+else:
+    mpz = gmpy2.mpz
+    isqrt = gmpy2.isqrt
+
+METHODS = ('agm', 'chudnovsky')
+GUARD_DIGITS = 10
+
+def decimal_string(n, block=1000):
+    """Return the decimal representation of the nonnegative integer n."""
+    if gmpy2 is not None:
+        return mpz(n).digits(10)
+    powers = [10**block]
+    while powers[-1].bit_length() <= n.bit_length()//2+1:
+        powers.append(powers[-1]*powers[-1])
+
+    def convert(n, k, pad):
+        if k < 0:
+            s = str(n)
+            return s.zfill(block) if pad else s
+        high, low = divmod(n, powers[k])
+        if high == 0 and not pad:
+            return convert(low, k-1, False)
+        return convert(high, k-1, pad)+convert(low, k-1, True)
+
+    return convert(n, len(powers)-1, False)
+
+def scaled_pi_agm(digits):
+    """Return pi*10**digits, rounded down, by the Gauss-Legendre algorithm."""
+    bits = int(digits*log2(10))+64
+    one = mpz(1) << bits
+    a = one
+    b = isqrt(one*one//2)
+    c_sum = 0
+    factor_two = 2
+    while abs(a-b) > 1:
+        a, b = (a+b) >> 1, isqrt(a*b)
+        factor_two = factor_two*2
+        c_sum = c_sum+factor_two*(a*a-b*b)
+    numerator = 4*a*a
+    denominator = one*one-c_sum
+    return numerator*mpz(10)**digits//denominator
+
+def _split(a, b):
+    """Return P, Q, T of the Chudnovsky series for the terms a to b-1."""
+    if b-a == 1:
+        if a == 0:
+            p = q = mpz(1)
+        else:
+            p = mpz((6*a-5)*(2*a-1)*(6*a-1))
+            q = mpz(a)**3*10939058860032000
+        t = p*(13591409+545140134*a)
+        return p, q, -t if a & 1 else t
+    m = (a+b)//2
+    p1, q1, t1 = _split(a, m)
+    p2, q2, t2 = _split(m, b)
+    return p1*p2, q1*q2, t1*q2+p1*t2
+
+def scaled_pi_chudnovsky(digits):
+    """Return pi*10**digits, rounded down, by the Chudnovsky series."""
+    terms = digits//14+2
+    _, q, t = _split(0, terms)
+    one = mpz(10)**digits
+    return 426880*isqrt(10005*one*one)*q//t
+
+def pi_digits(stellen, method='agm'):
+    """Return pi with stellen digits after the decimal point as a string.
+
+    The digits are truncated like in pi_agm.pi_digits().
+    """
+    if method == 'agm':
+        scaled = scaled_pi_agm(stellen+GUARD_DIGITS)
+    elif method == 'chudnovsky':
+        scaled = scaled_pi_chudnovsky(stellen+GUARD_DIGITS)
+    else:
+        raise ValueError('unknown method {!r}, expected one of {}'
+                         .format(method, ', '.join(METHODS)))
+    digits = decimal_string(scaled)[:stellen+1]
+    return digits[0]+'.'+digits[1:]
@@ -1,28 +1,22 @@
-import numpy as np
-import math
-import timeit
-import matplotlib.pyplot as plt
+import os
+import sys
 
-def f_numpy(nmax):
-    x = np.linspace(0, np.pi, nmax)
-    result = np.sin(x)
+import matplotlib.pyplot as plt
 
-def f_math(nmax):
-    dx = math.pi/(nmax-1)
-    result = [math.sin(n*dx) for n in xrange(nmax)]
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from benchmark import load, series
 
-x = []
-y = []
-for n in np.logspace(0.31, 6, 20):
-    nint = int(n)
-    t_numpy = timeit.timeit("f_numpy(%i)" % nint,
-                            "from __main__ import f_numpy",
-                            number=20)
-    t_math = timeit.timeit("f_math(%i)" % nint,
-                            "from __main__ import f_math",
-                            number=20)
-    x.append(nint)
-    y.append(t_math/t_numpy)
+try:
+    data = load('profiling_1.json')
+except FileNotFoundError:
+    # keep the published figure until profiling_timing.py has been run
+    # on representative hardware
+    print('profiling_1.json not found, run profiling_timing.py first')
+    sys.exit()
+t_numpy = series(data, 'sin-numpy', 'nmax')
+t_math = dict(series(data, 'sin-math', 'nmax'))
+x = [nmax for nmax, _ in t_numpy]
+y = [t_math[nmax]/t for nmax, t in t_numpy]
 plt.plot(x, y)
 plt.xscale("log")
 plt.savefig("profiling_1.png")
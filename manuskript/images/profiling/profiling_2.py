@@ -1,29 +1,22 @@
-import numpy as np
-import numexpr as ne
-import timeit
-import matplotlib.pyplot as plt
+import os
+import sys
 
-def f_numpy(nmax):
-    x = np.linspace(0, 1, nmax)
-    result = ((5*x-2)*x+1)*x-7
+import matplotlib.pyplot as plt
 
-def f_numexpr(nmax):
-    x = np.linspace(0, 1, nmax)
-    result = ne.evaluate("5*x**3-2*x**2+x-7")
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from benchmark import load, series
 
-x = []
-y = []
-for n in np.logspace(0.31, 6, 20):
-    nint = int(n)
-    print nint
-    t_numpy = timeit.timeit("f_numpy(%i)" % nint,
-                            "from __main__ import f_numpy",
-                            number=20)
-    t_numexpr = timeit.timeit("f_numexpr(%i)" % nint,
-                            "from __main__ import f_numexpr",
-                            number=20)
-    x.append(nint)
-    y.append(t_numpy/t_numexpr)
+try:
+    data = load('profiling_2.json')
+except FileNotFoundError:
+    # keep the published figure until profiling_timing.py has been run
+    # on representative hardware
+    print('profiling_2.json not found, run profiling_timing.py first')
+    sys.exit()
+t_numpy = dict(series(data, 'poly-numpy', 'nmax'))
+t_numexpr = series(data, 'poly-numexpr', 'nmax')
+x = [nmax for nmax, _ in t_numexpr]
+y = [t_numpy[nmax]/t for nmax, t in t_numexpr]
 plt.plot(x, y)
 plt.xscale("log")
 plt.savefig("profiling_2.png")
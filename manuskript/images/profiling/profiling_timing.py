@@ -0,0 +1,11 @@
+import os
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+import benchcases
+from benchmark import run, save
+
+for filename, cases in (('profiling_1.json', ['sin-numpy', 'sin-math']),
+                        ('profiling_2.json', ['poly-numpy', 'poly-numexpr'])):
+    save(run(cases, mintime=0.01, log=print), filename)
+    print('results written to', filename)
@@ -0,0 +1,123 @@
+"""Simulation of many one-dimensional random walks with bounded memory.
+
+The walkers are divided into groups of a fixed size, each of which draws
+its steps from an independent stream spawned from one SeedSequence, so that
+the result for a given seed does not depend on how the groups are spread
+over workers. A group is advanced in chunks of time steps. The steps are
+taken from random bits and stored as int8, and the positions are carried
+from one chunk to the next. Only the mean and the variance over all walkers
+are kept for each recorded time, where the contributions of the groups are
+merged by the parallel variant of Welford's algorithm as the groups finish,
+with a bounded number of groups in flight. Trajectories are only kept for
+the first walkers and can be downsampled.
+"""
+
+from collections import deque, namedtuple
+from concurrent import futures
+from functools import partial
+
+import numpy as np
+
+Walk = namedtuple('Walk', 'times mean var trajectories')
+
+def steps(rng, shape):
+    """Return an int8 array of steps -1 or +1 drawn from random bits."""
+    count = shape[0]*shape[1]
+    bits = np.frombuffer(rng.bytes((count+7)//8), dtype=np.uint8)
+    result = np.unpackbits(bits, count=count).view(np.int8).reshape(shape)
+    result <<= 1
+    result -= 1
+    return result
+
+def walk_group(seed, walkers, length, every=1, keep=0, maxelements=2**24):
+    """Simulate a group of walkers and return their moments.
+
+    Returns the mean, the sum of squared deviations from the mean for each
+    recorded time, and the trajectories of the first keep walkers.
+    """
+    rng = np.random.default_rng(seed)
+    dtype = np.int32 if length < 2**31 else np.int64
+    nrecords = length//every
+    mean = np.empty(nrecords)
+    m2 = np.empty(nrecords)
+    trajectories = np.empty((nrecords, keep), dtype=dtype)
+    position = np.zeros(walkers, dtype=dtype)
+    # Generator.bytes() draws whole 32-bit words, so that the stream of bits
+    # does not depend on the chunks if each chunk uses a multiple of 32 bits.
+    chunk = max(32, maxelements//walkers//32*32)
+    for t0 in range(0, length, chunk):
+        nsteps = min(chunk, length-t0)
+        positions = np.cumsum(steps(rng, (nsteps, walkers)), axis=0,
+                              dtype=dtype)
+        positions += position
+        position = positions[-1].copy()
+        first = (-(t0+1)) % every
+        recorded = positions[first::every]
+        r0 = (t0+1+first)//every-1
+        rows = slice(r0, r0+recorded.shape[0])
+        mean[rows] = recorded.mean(axis=1)
+        m2[rows] = ((recorded-mean[rows, np.newaxis])**2).sum(axis=1)
+        trajectories[rows] = recorded[:, :keep]
+    return mean, m2, trajectories
+
+def group_results(task, groups, max_workers, executor):
+    """Yield the results of task for groups in order.
+
+    The groups are run by executor or, for max_workers > 1, by a thread
+    pool, with at most two tasks per worker in flight, so that only the
+    results not yet consumed are held in memory.
+    """
+    if executor is None and max_workers == 1:
+        for s, n, k in groups:
+            yield task(s, n, keep=k)
+        return
+    pool = executor or futures.ThreadPoolExecutor(max_workers)
+    pending = deque()
+    try:
+        for s, n, k in groups:
+            if len(pending) == 2*max_workers:
+                yield pending.popleft().result()
+            pending.append(pool.submit(task, s, n, keep=k))
+        while pending:
+            yield pending.popleft().result()
+    finally:
+        for f in pending:
+            f.cancel()
+        if executor is None:
+            pool.shutdown()
+
+def random_walk(walkers, length, seed=None, every=1, keep=0, group=10000,
+                max_workers=1, executor=None, maxelements=2**24):
+    """Simulate walkers random walks with length steps of size one.
+
+    The mean and the variance over the walkers are returned for the times
+    every, 2*every, ... up to length, together with the trajectories of the
+    first keep walkers at these times. The walkers are simulated in groups
+    of size group, which are run by executor or, for max_workers > 1, by a
+    thread pool. For an executor, max_workers should be its number of
+    workers. The moments of each group are merged into the totals as soon
+    as the group is done, in the order of the groups, so that the result
+    does not depend on the timing of the workers. At most maxelements steps
+    of a group, but at least 32 steps per walker, are held in memory at a
+    time. For a given seed, the result does not depend on maxelements.
+    """
+    sizes = [min(group, walkers-start) for start in range(0, walkers, group)]
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+    keeps = [min(max(keep-start, 0), size)
+             for start, size in zip(range(0, walkers, group), sizes)]
+    task = partial(walk_group, length=length, every=every,
+                   maxelements=maxelements)
+    groups = list(zip(seeds, sizes, keeps))
+    count = 0
+    mean = m2 = 0
+    trajectories = []
+    for size, (group_mean, group_m2, group_trajectories) in zip(
+            sizes, group_results(task, groups, max_workers, executor)):
+        delta = group_mean-mean
+        total = count+size
+        mean = mean+delta*size/total
+        m2 = m2+group_m2+delta**2*count*size/total
+        count = total
+        trajectories.append(group_trajectories)
+    times = np.arange(every, length+1, every)
+    return Walk(times, mean, m2/count, np.concatenate(trajectories, axis=1))
@@ -0,0 +1,80 @@
+"""Content-addressed cache for computed arrays on disk.
+
+Each entry is stored as a compressed .npz file whose name is the SHA-256 hash
+of the parameters which determine the array. When the total size exceeds
+maxsize, the least recently used entries are removed. As this requires a
+scan of the whole directory, the cache is only trimmed after another
+maxsize/16 bytes have been written by the process. Entries are written to
+a temporary file first and then renamed, so that several processes may use
+the same cache directory.
+"""
+
+import hashlib
+import os
+import tempfile
+
+import numpy as np
+
+def default_directory():
+    """Return the cache directory, which may be set by PYTHONNAWI_CACHE."""
+    if 'PYTHONNAWI_CACHE' in os.environ:
+        return os.environ['PYTHONNAWI_CACHE']
+    base = os.environ.get('XDG_CACHE_HOME',
+                          os.path.join(os.path.expanduser('~'), '.cache'))
+    return os.path.join(base, 'pythonnawi')
+
+class ResultCache:
+    """Cache of arrays keyed on the repr of a tuple of parameters."""
+
+    def __init__(self, directory=None, maxsize=2**30):
+        self.directory = directory or default_directory()
+        self.maxsize = maxsize
+        self.written = 0
+        os.makedirs(self.directory, exist_ok=True)
+
+    def key(self, *params):
+        return hashlib.sha256(repr(params).encode('utf-8')).hexdigest()
+
+    def path(self, key):
+        return os.path.join(self.directory, key+'.npz')
+
+    def get(self, key):
+        """Return the array stored under key or None."""
+        path = self.path(key)
+        try:
+            with np.load(path) as npz:
+                data = npz['data']
+        except (OSError, KeyError, ValueError):
+            return None
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            pass
+        return data
+
+    def put(self, key, data):
+        fd, tmpname = tempfile.mkstemp(suffix='.tmp', dir=self.directory)
+        with os.fdopen(fd, 'wb') as fh:
+            np.savez_compressed(fh, data=data)
+            self.written += fh.tell()
+        os.replace(tmpname, self.path(key))
+        if self.written > self.maxsize//16:
+            self.trim()
+
+    def trim(self):
+        """Remove the least recently used entries exceeding maxsize."""
+        self.written = 0
+        entries = []
+        for entry in os.scandir(self.directory):
+            if entry.name.endswith('.npz'):
+                stat = entry.stat()
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.maxsize:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total = total-size
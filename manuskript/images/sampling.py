@@ -0,0 +1,163 @@
+"""Statistical profiler for unmodified scripts.
+
+A timer signal interrupts the main thread at regular intervals, and the
+current call stack is recorded together with the time elapsed since the
+previous sample. Python only handles the signal once a call into compiled
+code like a NumPy function has returned, but the elapsed time still counts,
+so that the time spent in such a call is attributed to the line calling it.
+In contrast to line_profiler, neither decorators nor a tracing function are
+needed, and the overhead is only that of the samples.
+
+Run as a script, the given script is executed with its arguments, a summary
+of the most expensive lines and functions is printed, and the samples can be
+written in the collapsed stack format read by flamegraph.pl or speedscope:
+
+    python sampling.py -o pi.collapsed pi.py
+
+By default, CPU time is sampled. With --wall, the wall time is sampled
+instead, which includes waiting for input and output. Only the main thread
+is sampled.
+"""
+
+import argparse
+from collections import Counter
+import os
+import runpy
+import signal
+import sys
+import time
+
+_IGNORED = (os.path.abspath(__file__), os.path.abspath(runpy.__file__),
+            '<frozen runpy>')
+
+class Sampler:
+    """Collect the call stacks of the main thread while active.
+
+    stacks maps tuples of (filename, function, line), outermost first, to
+    the time in seconds attributed to them.
+    """
+
+    def __init__(self, interval=0.005, wall=False):
+        self.interval = interval
+        self.wall = wall
+        self.stacks = Counter()
+        if wall:
+            self._signal, self._timer = signal.SIGALRM, signal.ITIMER_REAL
+            self._clock = time.perf_counter
+        else:
+            self._signal, self._timer = signal.SIGPROF, signal.ITIMER_PROF
+            self._clock = time.process_time
+
+    def _sample(self, signum, frame):
+        now = self._clock()
+        stack = []
+        while frame is not None:
+            code = frame.f_code
+            if code.co_filename not in _IGNORED:
+                stack.append((code.co_filename, code.co_name, frame.f_lineno))
+            frame = frame.f_back
+        self.stacks[tuple(reversed(stack))] += now-self._last
+        self._last = now
+
+    def start(self):
+        self._previous = signal.signal(self._signal, self._sample)
+        self._last = self._clock()
+        signal.setitimer(self._timer, self.interval, self.interval)
+
+    def stop(self):
+        signal.setitimer(self._timer, 0, 0)
+        signal.signal(self._signal, self._previous)
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def total(self):
+        return sum(self.stacks.values())
+
+    def lines(self):
+        """Return the self time for each (filename, function, line)."""
+        times = Counter()
+        for stack, t in self.stacks.items():
+            if stack:
+                times[stack[-1]] += t
+        return times
+
+    def functions(self):
+        """Return the self and the total time for each (filename, function)."""
+        own = Counter()
+        total = Counter()
+        for stack, t in self.stacks.items():
+            if not stack:
+                continue
+            own[stack[-1][:2]] += t
+            for function in set(frame[:2] for frame in stack):
+                total[function] += t
+        return own, total
+
+    def write_collapsed(self, filename):
+        """Write the stacks in the collapsed format with weights in us."""
+        with open(filename, 'w') as fh:
+            for stack, t in sorted(self.stacks.items()):
+                weight = round(t*1e6)
+                if stack and weight:
+                    frames = ';'.join('{} ({}:{})'.format(
+                                          name, os.path.basename(path), line)
+                                      for path, name, line in stack)
+                    fh.write('{} {}\n'.format(frames, weight))
+
+    def report(self, limit=15, file=sys.stderr):
+        total = self.total() or 1
+        print('{:>9} {:>6}  line'.format('seconds', '%'), file=file)
+        for (path, name, line), t in self.lines().most_common(limit):
+            print('{:9.3f} {:6.1f}  {}:{} ({})'.format(
+                  t, 100*t/total, os.path.relpath(path), line, name),
+                  file=file)
+        own, inclusive = self.functions()
+        print('\n{:>9} {:>9} {:>6}  function'.format('self', 'total', '%'),
+              file=file)
+        for (path, name), t in inclusive.most_common(limit):
+            print('{:9.3f} {:9.3f} {:6.1f}  {} ({})'.format(
+                  own[path, name], t, 100*t/total, name,
+                  os.path.relpath(path)), file=file)
+
+def run_script(path, args=(), interval=0.005, wall=False):
+    """Run the script path with args as __main__ and return the Sampler."""
+    path = os.path.abspath(path)
+    argv, sys_path = sys.argv, sys.path[:]
+    sys.argv = [path]+list(args)
+    sys.path.insert(0, os.path.dirname(path))
+    sampler = Sampler(interval, wall)
+    try:
+        with sampler:
+            runpy.run_path(path, run_name='__main__')
+    except SystemExit:
+        pass
+    finally:
+        sys.argv, sys.path[:] = argv, sys_path
+    return sampler
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description='Sample the call stacks of a Python script.')
+    parser.add_argument('-i', '--interval', type=float, default=0.005,
+                        help='sampling interval in seconds')
+    parser.add_argument('-o', '--output',
+                        help='file for the stacks in collapsed format')
+    parser.add_argument('--wall', action='store_true',
+                        help='sample wall time instead of CPU time')
+    parser.add_argument('-n', '--limit', type=int, default=15,
+                        help='number of lines and functions to report')
+    parser.add_argument('script')
+    parser.add_argument('args', nargs=argparse.REMAINDER)
+    args = parser.parse_args(argv)
+    sampler = run_script(args.script, args.args, args.interval, args.wall)
+    sampler.report(args.limit)
+    if args.output is not None:
+        sampler.write_collapsed(args.output)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,224 @@
+"""Scaling study of the registered benchmark cases over the number of workers.
+
+A case takes part if it has a parameter for the number of worker processes
+(workers) or Numba threads (threads). For each number of workers, the wall
+time and the CPU time are measured. The CPU time is taken from getrusage()
+for this process, including threads which have ended, and for the children
+which terminate during a call. The workers of a pool which keeps running,
+like a warm pool, are added from /proc, which also covers processes started
+by a forkserver. Where the resource module is not available, only the wall
+time is recorded.
+
+From the wall times, the speedup, the parallel efficiency and the serial
+fraction of Karp and Flatt are derived for each number of workers, and the
+serial fraction is fitted according to Amdahl's and Gustafson's laws.
+
+Run as a script, e.g.
+
+    python scaling.py -n 8 mandelbrot-pool zeta-parallel
+
+NUMBA_NUM_THREADS is raised to the largest number of threads if necessary
+before Numba is imported.
+"""
+
+import argparse
+from functools import partial
+import inspect
+import os
+import sys
+import time
+
+import numpy as np
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+from benchmark import (CASES, machine_metadata, median_interval, parameters,
+                       save, shared_contexts)
+
+WORKER_PARAMETERS = ('workers', 'threads')
+
+def _stat_times(path):
+    with open(path) as fh:
+        fields = fh.read().rpartition(')')[2].split()
+    return int(fields[1]), (int(fields[11])+int(fields[12]))
+
+def rusage_time():
+    """Return the CPU time of this process and of its terminated children.
+
+    The time of this process includes threads which have already ended.
+    """
+    return sum(r.ru_utime+r.ru_stime
+               for r in (resource.getrusage(resource.RUSAGE_SELF),
+                         resource.getrusage(resource.RUSAGE_CHILDREN)))
+
+def descendant_times():
+    """Return the CPU times of the running descendant processes by pid.
+
+    They cover the workers of pools which outlive a call, including those
+    started by a forkserver. An empty dict is returned where /proc is not
+    available.
+    """
+    tick = os.sysconf('SC_CLK_TCK')
+    children = {}
+    try:
+        for pid in os.listdir('/proc'):
+            if not pid.isdigit():
+                continue
+            try:
+                ppid, t = _stat_times('/proc/{}/stat'.format(pid))
+            except OSError:
+                continue
+            children.setdefault(ppid, []).append((int(pid), t))
+    except OSError:
+        return {}
+    times = {}
+    parents = [os.getpid()]
+    while parents:
+        for pid, t in children.get(parents.pop(), []):
+            times[pid] = t/tick
+            parents.append(pid)
+    return times
+
+def timed_call(func):
+    """Call func and return its wall time and CPU time, which may be None.
+
+    The CPU time is taken from getrusage() for this process and for the
+    children which terminate during the call, and from /proc for the
+    descendant processes still running after the call. Descendants which are
+    not children of this process, like the workers of a forkserver, are only
+    counted if they are still running.
+    """
+    if resource is None:
+        start = time.perf_counter()
+        func()
+        return time.perf_counter()-start, None
+    before = rusage_time()
+    before_descendants = descendant_times()
+    start = time.perf_counter()
+    func()
+    wall = time.perf_counter()-start
+    after_descendants = descendant_times()
+    cpu = rusage_time()-before
+    cpu = cpu+sum(t-before_descendants.get(pid, 0)
+                  for pid, t in after_descendants.items())
+    return wall, cpu
+
+def worker_parameter(benchmark):
+    for name in WORKER_PARAMETERS:
+        if name in benchmark.sweep:
+            return name
+    raise ValueError('case {!r} has no parameter for the number of workers'
+                     .format(benchmark.name))
+
+def amdahl_fraction(workers, walls):
+    """Return the serial fraction of a fit of T(p) = T_s+T_p/p."""
+    p = np.asarray(workers, dtype=float)
+    (ts, tp), *_ = np.linalg.lstsq(np.column_stack((np.ones_like(p), 1/p)),
+                                   np.asarray(walls), rcond=None)
+    return ts/(ts+tp)
+
+def gustafson_fraction(workers, speedups):
+    """Return the serial fraction of a fit of S(p) = p-s*(p-1)."""
+    p = np.asarray(workers, dtype=float)
+    s = np.asarray(speedups)
+    if np.all(p == 1):
+        return 0.
+    return np.sum((p-s)*(p-1))/np.sum((p-1)**2)
+
+def study(benchmark, parameter, params, counts, repeat=3, warmup=1,
+          log=None):
+    """Measure benchmark with params for each number of workers in counts.
+
+    The speedups refer to the first entry of counts, which should be 1.
+    """
+    points = []
+    for count in counts:
+        with benchmark.setup(**dict(params, **{parameter: count})) as func:
+            for _ in range(warmup):
+                func()
+            runs = [timed_call(func) for _ in range(repeat)]
+        walls = [wall for wall, _ in runs]
+        median = float(np.median(walls))
+        wall, cpu = min(runs, key=lambda run: abs(run[0]-median))
+        points.append({'workers': count, 'times': walls, 'wall': median,
+                       'ci': median_interval(walls), 'cpu': cpu})
+        if log is not None:
+            log('{} {} {}={} {:.6g}'.format(benchmark.name, params, parameter,
+                                            count, median))
+    t1 = points[0]['wall']
+    for point in points:
+        p = point['workers']
+        point['speedup'] = t1/point['wall']
+        point['efficiency'] = point['speedup']/p
+        point['karp_flatt'] = ((1/point['speedup']-1/p)/(1-1/p)
+                               if p > 1 else None)
+    workers = [point['workers'] for point in points]
+    return {'case': benchmark.name, 'parameter': parameter, 'params': params,
+            'points': points,
+            'amdahl': amdahl_fraction(workers,
+                                      [point['wall'] for point in points]),
+            'gustafson': gustafson_fraction(workers,
+                                            [point['speedup']
+                                             for point in points])}
+
+def scaling(name, counts, repeat=3, warmup=1, overrides=None, log=None):
+    """Return scaling studies of case name, one for each point of its sweep.
+
+    The sweep is the default sweep of the case without the number of
+    workers, updated by overrides.
+    """
+    benchmark = CASES[name]
+    parameter = worker_parameter(benchmark)
+    sweep = dict(benchmark.sweep)
+    del sweep[parameter]
+    accepted = inspect.signature(benchmark.setup).parameters
+    sweep.update((k, v) for k, v in (overrides or {}).items()
+                 if k in accepted and k != parameter)
+    with shared_contexts():
+        return [study(benchmark, parameter, params, counts, repeat, warmup,
+                      log)
+                for params in parameters(sweep)]
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description='Measure the scaling of benchmark cases with the number '
+                    'of workers.')
+    parser.add_argument('cases', nargs='+')
+    parser.add_argument('-n', '--max-workers', type=int,
+                        default=os.cpu_count())
+    parser.add_argument('-o', '--output', default='scaling.json')
+    parser.add_argument('-r', '--repeat', type=int, default=3)
+    parser.add_argument('-w', '--warmup', type=int, default=1)
+    parser.add_argument('-s', '--set', action='append', default=[],
+                        metavar='NAME=VALUE', help='replace a parameter')
+    args = parser.parse_args(argv)
+    if 'numba' not in sys.modules:
+        threads = int(os.environ.get('NUMBA_NUM_THREADS', 0))
+        os.environ['NUMBA_NUM_THREADS'] = str(max(threads, args.max_workers,
+                                                  os.cpu_count()))
+    from benchcases import parse_overrides
+    overrides = parse_overrides(args.set)
+    counts = range(1, args.max_workers+1)
+    studies = [result for name in args.cases
+               for result in scaling(name, counts, args.repeat, args.warmup,
+                                     overrides,
+                                     log=partial(print, file=sys.stderr))]
+    for result in studies:
+        print('{} {} (serial fraction: Amdahl {:.3f}, Gustafson {:.3f})'
+              .format(result['case'], result['params'], result['amdahl'],
+                      result['gustafson']))
+        print('{:>8} {:>10} {:>10} {:>8} {:>10}'.format(
+              result['parameter'], 'wall', 'cpu', 'speedup', 'efficiency'))
+        for point in result['points']:
+            print('{:8d} {:10.4g} {:>10} {:8.2f} {:10.2f}'.format(
+                  point['workers'], point['wall'],
+                  '-' if point['cpu'] is None
+                  else '{:.4g}'.format(point['cpu']),
+                  point['speedup'], point['efficiency']))
+    save({'metadata': machine_metadata(), 'studies': studies}, args.output)
+
+if __name__ == '__main__':
+    main()
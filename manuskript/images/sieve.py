@@ -0,0 +1,147 @@
+"""Segmented sieve of Eratosthenes for odd numbers.
+
+Only odd numbers are sieved, the index i standing for 2*i+1. The range is
+processed in segments of one byte per odd number whose size is chosen to
+fit into the L2 cache. Within a segment, the multiples of small primes are
+crossed out by strided slices, while those of larger primes, which hit a
+segment only a few times, are crossed out for all of them at once by fancy
+indexing. Finished segments are packed into a bit array (odd_sieve()),
+turned into primes (primes()) or only counted (prime_count()), so that the
+latter two need memory only for the segments in flight and for the primes
+up to the square root of the limit.
+
+Segments can be sieved by a process pool, where at most two tasks per
+worker are in flight, so that primes() can stream its results in order.
+"""
+
+from collections import deque
+import math
+
+import numpy as np
+
+from workerpool import worker_pool
+
+SEGMENT = 2**18
+DENSE_HITS = 16
+
+def base_primes(n):
+    """Return the primes up to and including n."""
+    if n < 2:
+        return np.zeros(0, dtype=np.int64)
+    flags = np.ones((n+1)//2, dtype=bool)
+    flags[0] = False
+    for i in range(1, (math.isqrt(n)+1)//2):
+        if flags[i]:
+            p = 2*i+1
+            flags[p*p//2::p] = False
+    return np.concatenate(([2], 2*np.flatnonzero(flags)+1)).astype(np.int64)
+
+def sieve_segment(i0, i1, primes):
+    """Return flags for the odd numbers 2*i+1 with i0 <= i < i1.
+
+    primes are the odd primes up to the square root of 2*i1-1.
+    """
+    flags = np.ones(i1-i0, dtype=bool)
+    if i0 == 0:
+        flags[0] = False
+    start = 2*i0+1
+    first = np.maximum(-(-start//primes)*primes, primes*primes)
+    first = first+primes*(first % 2 == 0)
+    offsets = (first-1)//2-i0
+    dense = primes < (i1-i0)//DENSE_HITS
+    for p, offset in zip(primes[dense].tolist(), offsets[dense].tolist()):
+        flags[offset::p] = False
+    p = primes[~dense]
+    offset = offsets[~dense]
+    while offset.size:
+        hit = offset < flags.size
+        p = p[hit]
+        offset = offset[hit]
+        flags[offset] = False
+        offset = offset+p
+    return flags
+
+def sieve_block(i0, i1, segment, primes, kind):
+    """Sieve the indices i0 to i1 segment by segment.
+
+    Depending on kind, the number of primes, the primes or the flags packed
+    into bits are returned.
+    """
+    results = []
+    for s0 in range(i0, i1, segment):
+        s1 = min(s0+segment, i1)
+        flags = sieve_segment(s0, s1,
+                              primes[:np.searchsorted(primes,
+                                                      math.isqrt(2*s1-1),
+                                                      side='right')])
+        if kind == 'count':
+            results.append(np.count_nonzero(flags))
+        elif kind == 'primes':
+            results.append(2*(np.flatnonzero(flags)+s0)+1)
+        else:
+            results.append(flags)
+    if kind == 'count':
+        return sum(results)
+    if kind == 'primes':
+        return np.concatenate(results)
+    return np.packbits(np.concatenate(results), bitorder='little')
+
+def sieve_blocks(limit, kind, segment=SEGMENT, blocksize=16, max_workers=1,
+                 executor=None):
+    """Yield the results of sieve_block() for the odd numbers below limit.
+
+    Each task comprises blocksize segments. With max_workers > 1 or an
+    executor, the tasks are run by a process pool, keeping the results in
+    order and at most two tasks per worker in flight.
+    """
+    nodd = limit//2
+    primes = base_primes(math.isqrt(max(limit-1, 0)))[1:]
+    step = segment*blocksize
+    if kind == 'bits':
+        # Blocks must be a multiple of 8 indices to concatenate bit arrays.
+        step = -(-step//8)*8
+    blocks = [(i0, min(i0+step, nodd)) for i0 in range(0, nodd, step)]
+    if executor is None and max_workers == 1:
+        for i0, i1 in blocks:
+            yield sieve_block(i0, i1, segment, primes, kind)
+        return
+    with worker_pool(executor, max_workers) as pool:
+        pending = deque()
+        for i0, i1 in blocks:
+            pending.append(pool.submit(sieve_block, i0, i1, segment, primes,
+                                       kind))
+            if len(pending) >= 2*max_workers:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+def odd_sieve(limit, **options):
+    """Return the primality of the odd numbers below limit as packed bits.
+
+    Bit i, counted from the least significant bit of each byte, tells
+    whether 2*i+1 is prime. The options are those of sieve_blocks().
+    """
+    blocks = list(sieve_blocks(limit, 'bits', **options))
+    if not blocks:
+        return np.zeros(0, dtype=np.uint8)
+    return np.concatenate(blocks)
+
+def is_prime(table, n):
+    """Look up whether n is prime in a table returned by odd_sieve()."""
+    if n < 3 or n % 2 == 0:
+        return n == 2
+    i = n//2
+    return bool(table[i >> 3] >> (i & 7) & 1)
+
+def primes(limit, **options):
+    """Yield arrays of the primes below limit in increasing order."""
+    if limit > 2:
+        yield np.array([2], dtype=np.int64)
+    yield from sieve_blocks(limit, 'primes', **options)
+
+def prime_count(x, **options):
+    """Return the number of primes less than or equal to x."""
+    limit = int(x)+1
+    if limit <= 2:
+        return 0
+    return 1+sum(sieve_blocks(limit, 'count', **options))
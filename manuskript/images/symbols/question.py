@@ -1,6 +1,12 @@
+import os
+import sys
+
 from pyx import canvas, color, text
 
-text.set(text.LatexRunner)
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from textcache import CachedEngine
+
+text.set(CachedEngine)
 c = canvas.canvas()
 t = text.text(0, 0, r"\sffamily\bfseries ?")
 tblarge = t.bbox().enlarged(0.1)
@@ -0,0 +1,46 @@
+"""Tests of the regression store for benchmark runs.
+
+Run by python -m unittest test_benchstore in the images directory.
+"""
+
+import json
+import os
+import tempfile
+import unittest
+
+from benchstore import compare, mann_whitney_greater
+
+OLD = 'a'*40
+NEW = 'b'*40
+
+def entry(revision, times):
+    return {'revision': revision, 'fingerprint': 'machine',
+            'metadata': {},
+            'results': [{'case': name, 'params': {'n': 1}, 'times': t}
+                        for name, t in times.items()]}
+
+class BenchStoreTest(unittest.TestCase):
+
+    def test_mann_whitney(self):
+        self.assertAlmostEqual(mann_whitney_greater([6, 7, 8, 9, 10],
+                                                    [1, 2, 3, 4, 5]), 1/252)
+        self.assertEqual(mann_whitney_greater([1, 2, 3], [4, 5, 6]), 1)
+        large = mann_whitney_greater(list(range(30, 60)), list(range(30)))
+        self.assertLess(large, 1e-6)
+
+    def test_compare(self):
+        fast = [1.0, 1.01, 0.99, 1.02, 0.98]
+        slow = [1.5, 1.51, 1.49, 1.52, 1.48]
+        with tempfile.TemporaryDirectory() as directory:
+            store = os.path.join(directory, 'store.jsonl')
+            with open(store, 'w') as fh:
+                for e in (entry(OLD, {'same': fast, 'slower': fast}),
+                          entry(NEW, {'same': fast, 'slower': slow}),
+                          entry(NEW+'+', {'same': slow})):
+                    fh.write(json.dumps(e)+'\n')
+            rows = compare(OLD, NEW, store, machine='machine')
+        flagged = {row[0]: row[-1] for row in rows}
+        self.assertEqual(flagged, {'same': False, 'slower': True})
+
+if __name__ == '__main__':
+    unittest.main()
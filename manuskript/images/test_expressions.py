@@ -0,0 +1,59 @@
+"""Tests of the expression evaluator.
+
+Run by python -m unittest test_expressions in the images directory.
+"""
+
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+import numpy as np
+
+import expressions
+
+class ExpressionTest(unittest.TestCase):
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        patcher = mock.patch.dict(os.environ,
+                                  {'PYTHONNAWI_CACHE': directory.name})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_backends_agree(self):
+        x = np.linspace(0, 1, 1000)
+        y = np.linspace(1, 2, 1000)
+        expected = 5*x**3-2*np.sin(y)+np.pi
+        for backend in expressions.available_backends():
+            with self.subTest(backend=backend):
+                np.testing.assert_allclose(
+                    expressions.evaluate('5*x**3-2*sin(y)+pi',
+                                         backend=backend, x=x, y=y),
+                    expected)
+
+    def test_numexpr_functions(self):
+        for expr, compatible in (('sin(x)+1', True),
+                                 ('maximum(x, y)+1', False),
+                                 ('log2(x)+1', False),
+                                 ('x.sum()+1', False)):
+            with self.subTest(expr=expr):
+                self.assertEqual(expressions.parse(expr).numexpr_compatible,
+                                 compatible)
+
+    def test_choose_available(self):
+        calibration = {'sizes': [16, 1024],
+                       'times': {'numpy': [1., 3.], 'numexpr': [2., 1.],
+                                 'numba': [2., 2.]}}
+        with mock.patch.object(expressions, '_calibration', calibration), \
+             mock.patch.object(expressions, 'available_backends',
+                               return_value=('numpy', 'numba')):
+            self.assertEqual(expressions.choose_backend('x*y+1', 10), 'numpy')
+            self.assertEqual(expressions.choose_backend('x*y+1', 2000),
+                             'numba')
+            with self.assertRaises(ValueError):
+                expressions.evaluate('x*y+1', backend='numexpr', x=1, y=2)
+
+if __name__ == '__main__':
+    unittest.main()
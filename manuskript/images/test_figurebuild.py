@@ -0,0 +1,76 @@
+"""Tests of the incremental figure build.
+
+Run by python -m unittest test_figurebuild in the images directory.
+"""
+
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+import figurebuild
+from figurebuild import Manifest
+
+class ManifestTest(unittest.TestCase):
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.root = directory.name
+        patcher = mock.patch.object(figurebuild, 'ROOT', self.root)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        os.mkdir(os.path.join(self.root, 'figures'))
+        self.write('figures/plot.py', 'print(1)\n')
+        self.write('figures/data.json', '[1]\n')
+        self.write('figures/plot.png', 'png')
+        self.filename = os.path.join(self.root, 'manifest.json')
+
+    def write(self, path, content):
+        with open(os.path.join(self.root, path), 'w') as fh:
+            fh.write(content)
+
+    def test_discover(self):
+        self.assertEqual(figurebuild.discover(), ['figures/plot.py'])
+        self.assertEqual(figurebuild.discover(('figures/*',)), [])
+
+    def test_stale(self):
+        manifest = Manifest(self.filename)
+        self.assertEqual(manifest.stale('figures/plot.py'), 'never built')
+        manifest.update('figures/plot.py',
+                        ['figures/plot.py', 'figures/data.json',
+                         'figures/missing.json'],
+                        ['figures/plot.png'])
+        manifest.save()
+        manifest = Manifest(self.filename)
+        self.assertIsNone(manifest.stale('figures/plot.py'))
+        self.write('figures/data.json', '[1, 2]\n')
+        self.assertEqual(manifest.stale('figures/plot.py'),
+                         'figures/data.json changed')
+        manifest.update('figures/plot.py',
+                        ['figures/plot.py', 'figures/data.json',
+                         'figures/missing.json'],
+                        ['figures/plot.png'])
+        self.write('figures/missing.json', '[]\n')
+        self.assertEqual(manifest.stale('figures/plot.py'),
+                         'figures/missing.json changed')
+        os.remove(os.path.join(self.root, 'figures/missing.json'))
+        os.remove(os.path.join(self.root, 'figures/plot.png'))
+        self.assertEqual(manifest.stale('figures/plot.py'),
+                         'figures/plot.png missing')
+
+    def test_producers(self):
+        manifest = Manifest(self.filename)
+        manifest.update('figures/data.py', ['figures/data.py'],
+                        ['figures/data.json'])
+        manifest.update('figures/plot.py',
+                        ['figures/plot.py', 'figures/data.json'],
+                        ['figures/plot.png'])
+        scripts = ['figures/data.py', 'figures/plot.py']
+        self.assertEqual(manifest.producers('figures/plot.py', scripts),
+                         {'figures/data.py'})
+        self.assertEqual(manifest.producers('figures/data.py', scripts),
+                         set())
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,77 @@
+"""Tests of the Mandelbrot engine.
+
+Run by python -m unittest test_mandelbrot in the images directory.
+"""
+
+import importlib.util
+import os
+import tempfile
+import unittest
+
+import numpy as np
+
+from mandelbrot import BACKENDS, escape_time, mandelbrot_set, render_to_file
+from resultcache import ResultCache
+
+class BackendTest(unittest.TestCase):
+
+    def backends(self):
+        for backend in BACKENDS:
+            if (backend.startswith('numba')
+                    and importlib.util.find_spec('numba') is None):
+                continue
+            yield backend
+
+    def test_periodicity(self):
+        cy, cx = np.mgrid[-1.5:1.5:32j, -2:1:32j]
+        expected = escape_time(cx, cy, 100)
+        for backend in self.backends():
+            with self.subTest(backend=backend):
+                data = mandelbrot_set(-2, 1, -1.5, 1.5, 32, 100,
+                                      backend=backend, dtype='float64',
+                                      periodicity=True)
+                np.testing.assert_array_equal(data, expected)
+
+    def test_cache_smooth(self):
+        with tempfile.TemporaryDirectory() as directory:
+            cache = ResultCache(directory)
+            args = (-2, 1, -1.5, 1.5, 48, 100)
+            integer = mandelbrot_set(*args, cache=cache, tilesize=16)
+            np.testing.assert_array_equal(integer, mandelbrot_set(*args))
+            for run in range(2):
+                data = mandelbrot_set(*args, cache=cache, tilesize=16,
+                                      smooth=True)
+                np.testing.assert_array_equal(
+                    data, mandelbrot_set(*args, smooth=True))
+
+    def test_arbitrary_rejects_options(self):
+        for options in ({'backend': 'process-pool'}, {'periodicity': True},
+                        {'smooth': True}):
+            with self.subTest(**options):
+                with self.assertRaises(ValueError):
+                    mandelbrot_set('-2', '1', '-1.5', '1.5', 8, 20,
+                                   dtype='arbitrary', **options)
+
+    def test_numba_rejects_options(self):
+        for options in ({'smooth': True}, {'shared': True}):
+            with self.subTest(**options):
+                with self.assertRaises(ValueError):
+                    mandelbrot_set(-2, 1, -1.5, 1.5, 8, 20,
+                                   backend='numba-serial', **options)
+
+    def test_render_to_file_options(self):
+        with tempfile.TemporaryDirectory() as directory:
+            filename = os.path.join(directory, 'image.npy')
+            args = (filename, -2, 1, -1.5, 1.5, 32, 50)
+            data = render_to_file(*args, tilesize=16, max_workers=1,
+                                  smooth=True)
+            self.assertEqual(data.dtype, np.float64)
+            del data
+            with self.assertRaises(ValueError):
+                render_to_file(*args, tilesize=16, max_workers=1)
+            with self.assertRaises(ValueError):
+                render_to_file(*args, tilesize=16, dtype=np.int32,
+                               resume=False, smooth=True)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,39 @@
+"""Tests of the fast computation of the digits of pi.
+
+Run by python -m unittest test_pidigits in the images directory.
+"""
+
+import random
+import unittest
+
+import pi_agm
+from pidigits import METHODS, decimal_string, pi_digits
+
+PI_50 = '3.14159265358979323846264338327950288419716939937510'
+
+class PiDigitsTest(unittest.TestCase):
+
+    def test_known_digits(self):
+        for method in METHODS:
+            with self.subTest(method=method):
+                self.assertEqual(pi_digits(50, method), PI_50)
+
+    def test_methods_agree(self):
+        expected = pi_agm.pi_digits(2000)
+        for method in METHODS:
+            with self.subTest(method=method):
+                self.assertEqual(pi_digits(2000, method), expected)
+
+    def test_decimal_string(self):
+        rng = random.Random(1)
+        for n in [0, 7, 10**20, 10**45-1]+[rng.getrandbits(500)
+                                            for _ in range(20)]:
+            with self.subTest(n=n):
+                self.assertEqual(decimal_string(n, block=7), str(n))
+
+    def test_unknown_method(self):
+        with self.assertRaises(ValueError):
+            pi_digits(10, 'leibniz')
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,38 @@
+"""Tests of the random walk simulator.
+
+Run by python -m unittest test_randomwalk in the images directory.
+"""
+
+import unittest
+
+import numpy as np
+
+from randomwalk import random_walk
+
+class RandomWalkTest(unittest.TestCase):
+
+    def test_maxelements(self):
+        expected = random_walk(100, 500, seed=1, keep=5, group=30)
+        for maxelements in (64, 30*37):
+            with self.subTest(maxelements=maxelements):
+                walk = random_walk(100, 500, seed=1, keep=5, group=30,
+                                   maxelements=maxelements)
+                np.testing.assert_array_equal(walk.trajectories,
+                                              expected.trajectories)
+                np.testing.assert_allclose(walk.var, expected.var)
+
+    def test_workers(self):
+        expected = random_walk(100, 200, seed=2, every=10, group=30)
+        walk = random_walk(100, 200, seed=2, every=10, group=30,
+                           max_workers=2)
+        np.testing.assert_array_equal(walk.mean, expected.mean)
+        np.testing.assert_array_equal(walk.var, expected.var)
+
+    def test_moments(self):
+        walk = random_walk(20000, 100, seed=3, every=10, group=5000)
+        np.testing.assert_array_equal(walk.times, np.arange(10, 101, 10))
+        self.assertLess(np.max(np.abs(walk.mean)), 0.5)
+        np.testing.assert_allclose(walk.var, walk.times, rtol=0.05)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,39 @@
+"""Tests of the segmented sieve of Eratosthenes.
+
+Run by python -m unittest test_sieve in the images directory.
+"""
+
+import unittest
+
+import numpy as np
+
+from sieve import base_primes, is_prime, odd_sieve, prime_count, primes
+
+# known values of the prime counting function
+PI = {0: 0, 1: 0, 2: 1, 3: 2, 10: 4, 100: 25, 1000: 168, 10**4: 1229,
+      10**5: 9592, 10**6: 78498, 10**7: 664579}
+
+class SieveTest(unittest.TestCase):
+
+    def test_prime_count(self):
+        for x, expected in PI.items():
+            with self.subTest(x=x):
+                self.assertEqual(prime_count(x), expected)
+
+    def test_small_segments(self):
+        for options in ({'segment': 100, 'blocksize': 3},
+                        {'segment': 64, 'max_workers': 2}):
+            with self.subTest(**options):
+                self.assertEqual(prime_count(10**5, **options), PI[10**5])
+                np.testing.assert_array_equal(
+                    np.concatenate(list(primes(10**4, **options))),
+                    base_primes(10**4-1))
+
+    def test_odd_sieve(self):
+        table = odd_sieve(1000, segment=50)
+        expected = set(base_primes(999).tolist())
+        for n in range(1000):
+            self.assertEqual(is_prime(table, n), n in expected, n)
+
+if __name__ == '__main__':
+    unittest.main()
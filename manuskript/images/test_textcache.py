@@ -0,0 +1,71 @@
+"""Tests of the PyX text cache which do not need TeX.
+
+Run by python -m unittest test_textcache in the images directory.
+"""
+
+import struct
+import tempfile
+import unittest
+from unittest import mock
+
+import textcache
+from textcache import CachedEngine, single_page_dvi, split_dvi
+
+PREAMBLE = struct.pack('>BBiiiB', 247, 2, 25400000, 473628672, 1000, 0)
+FONTDEF = struct.pack('>BBiiiBB', 243, 0, 0, 655360, 655360, 0, 5)+b'cmr10'
+
+def page(number, content):
+    return struct.pack('>B10ii', 139, 0, 0, 0, number, 0, 0, 0, 0, 0, 0,
+                       -1)+content+b'\x8c'
+
+class DVITest(unittest.TestCase):
+
+    def test_split(self):
+        first = FONTDEF+b'\xabA'
+        second = b'\xabBC'
+        data = PREAMBLE+page(1, first)+page(2, second)+b'\xf8'
+        preamble, fontdefs, pages = split_dvi(data)
+        self.assertEqual(preamble, PREAMBLE)
+        self.assertEqual(fontdefs, {0: FONTDEF})
+        self.assertEqual(pages[1][1:], (first+b'\x8c', set()))
+        self.assertEqual(pages[2][1:], (second+b'\x8c', {0}))
+        single = single_page_dvi(preamble, fontdefs, *pages[2])
+        self.assertEqual(len(single) % 4, 0)
+        _, fontdefs, pages = split_dvi(single)
+        self.assertEqual(fontdefs, {0: FONTDEF})
+        self.assertEqual(pages[2][1], FONTDEF+second+b'\x8c')
+
+class Engine:
+    """Stand-in for a PyX engine without the internals used by the cache."""
+
+    def __init__(self):
+        self.preambles = []
+        self.texts = []
+
+    def preamble(self, expr, texmessages=[]):
+        self.preambles.append(expr)
+
+    def text_pt(self, x_pt, y_pt, expr, *args):
+        self.texts.append(expr)
+        return expr
+
+class FallbackTest(unittest.TestCase):
+
+    def test_unsupported_engine(self):
+        with tempfile.TemporaryDirectory() as directory:
+            engine = CachedEngine(Engine, directory=directory)
+            engine.preamble(r'\usepackage{amsmath}')
+            self.assertFalse(engine.caching)
+            self.assertEqual(engine.text_pt(0, 0, 'x'), 'x')
+            self.assertEqual(engine.engine.preambles, [r'\usepackage{amsmath}'])
+
+    def test_unsupported_version(self):
+        with tempfile.TemporaryDirectory() as directory, \
+             mock.patch.object(textcache, 'pyx_version', '0.1'):
+            self.assertFalse(CachedEngine(directory=directory).caching)
+        with tempfile.TemporaryDirectory() as directory:
+            self.assertEqual(CachedEngine(directory=directory).caching,
+                             textcache.pyx_version in textcache.SUPPORTED_PYX)
+
+if __name__ == '__main__':
+    unittest.main()
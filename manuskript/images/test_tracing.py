@@ -0,0 +1,50 @@
+"""Tests of the task tracing for executors.
+
+Run by python -m unittest test_tracing in the images directory.
+"""
+
+from concurrent import futures
+import os
+import threading
+import unittest
+
+from tracing import TracingExecutor, executed, workers
+from workerpool import pool_context
+
+def square(x):
+    return x*x
+
+def fail(x):
+    raise ValueError(x)
+
+class TracingTest(unittest.TestCase):
+
+    def test_thread_pool(self):
+        with TracingExecutor(futures.ThreadPoolExecutor(2)) as tracer:
+            self.assertEqual(list(tracer.map(square, range(8))),
+                             [x*x for x in range(8)])
+        self.assertEqual(len(executed(tracer.events)), 8)
+        for event in tracer.events:
+            self.assertEqual(event['pid'], os.getpid())
+            self.assertLessEqual(event['submit'], event['start'])
+            self.assertLessEqual(event['start'], event['end'])
+            self.assertLessEqual(event['end'], event['finished'])
+        self.assertLessEqual(len(workers(tracer.events)), 2)
+
+    def test_process_pool(self):
+        with TracingExecutor(futures.ProcessPoolExecutor(
+                2, mp_context=pool_context())) as tracer:
+            self.assertEqual(tracer.submit(square, 3).result(), 9)
+            future = tracer.submit(fail, 1)
+            with self.assertRaises(ValueError):
+                future.result()
+            # an argument which cannot be pickled fails through the future
+            future = tracer.submit(square, threading.Lock())
+            self.assertIsInstance(future.exception(), TypeError)
+        errors = [event for event in tracer.events if 'error' in event]
+        self.assertEqual(len(errors), 2)
+        self.assertEqual(len(executed(tracer.events)), 2)
+        self.assertNotEqual(executed(tracer.events)[0]['pid'], os.getpid())
+
+if __name__ == '__main__':
+    unittest.main()
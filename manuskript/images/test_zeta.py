@@ -0,0 +1,40 @@
+"""Tests of the chunked zeta summation.
+
+Run by python -m unittest test_zeta in the images directory.
+"""
+
+import unittest
+
+import numpy as np
+
+from zeta import zeta
+
+class ZetaTest(unittest.TestCase):
+
+    def test_known_values(self):
+        x = np.array([2., 4., 6.])
+        expected = np.pi**x*np.array([1/6, 1/90, 1/945])
+        np.testing.assert_allclose(zeta(x), expected, rtol=1e-14)
+
+    def test_small_nmax(self):
+        for nmax in (1, 2, 5):
+            with self.subTest(nmax=nmax):
+                self.assertAlmostEqual(zeta(2., nmax=nmax), np.pi**2/6,
+                                       places=14)
+
+    def test_zero(self):
+        self.assertLess(abs(zeta(0.5+14.134725141734693j)), 1e-13)
+
+    def test_partial_sums(self):
+        x = np.linspace(2, 4, 5)
+        expected = zeta(x, nmax=1000, tail=False)
+        for options in ({'max_workers': 2}, {'maxelements': 64}):
+            with self.subTest(**options):
+                np.testing.assert_allclose(
+                    zeta(x, nmax=1000, tail=False, **options), expected,
+                    rtol=1e-15)
+        with self.assertRaises(ValueError):
+            zeta(x, tail=False)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,233 @@
+"""Persistent cache of the texts typeset by TeX for PyX figures.
+
+Every label of a PyX figure is typeset by a TeX process, which has to be
+started and fed with the preamble before the first label, even if the
+figure is rendered again without any change. CachedEngine wraps a PyX text
+engine and looks up each text in a cache on disk, keyed on the engine, its
+preambles and the TeX expression resulting from the text attributes.
+Only texts not found there are passed to TeX, and if all texts are found,
+TeX is not started at all. The cache directory is shared by all scripts.
+
+An entry consists of the extents of the box reported by TeX and of a DVI
+file containing only the page of this text, together with the definitions
+of the fonts used on it. The page is cut out of the DVI file of the TeX
+run when the output of the figure is written. Markers and fill styles
+work as usual, since the page is read by PyX like the original one.
+
+To use the cache, replace text.set(text.LatexRunner) by
+
+    text.set(textcache.CachedEngine)
+
+The cache relies on internals of the PyX text engines, which have been
+checked for the versions in SUPPORTED_PYX. For other versions, or if the
+internals are missing, the texts are passed to the engine without caching.
+"""
+
+import atexit
+import hashlib
+import json
+import os
+import struct
+
+from pyx import __version__ as pyx_version
+from pyx import attr, style, text, trafo, unit
+from pyx.dvi.dvifile import DVIfile
+
+from resultcache import default_directory
+
+SUPPORTED_PYX = ('0.15', '0.16', '0.17')
+
+def _pt(length):
+    """Return the unscaled size in pts of a length of type x."""
+    return unit.topt(unit.length(length.x, type='t', unit='m'))
+
+def _operand_size(cmd, data, pos):
+    """Return the number of bytes following the DVI command cmd at pos."""
+    if cmd < 128 or cmd in (138, 140, 141, 142, 147, 152, 161, 166) \
+            or 171 <= cmd <= 234:
+        return 0
+    if cmd in (132, 137):
+        return 8
+    if cmd == 139:
+        return 44
+    for first in (128, 133, 143, 148, 153, 157, 162, 167, 235):
+        if first <= cmd < first+4:
+            return cmd-first+1
+    if 239 <= cmd <= 242:
+        k = cmd-238
+        return k+int.from_bytes(data[pos:pos+k], 'big')
+    if 243 <= cmd <= 246:
+        k = cmd-242
+        a, l = data[pos+k+12], data[pos+k+13]
+        return k+14+a+l
+    raise ValueError('unexpected DVI command {}'.format(cmd))
+
+def split_dvi(data):
+    """Split DVI data into single pages.
+
+    Returns the preamble, a dictionary mapping the font numbers to their
+    definitions and a dictionary mapping the page numbers \\count3 to the
+    counts, the content of the page up to and including eop, and the set
+    of fonts used on the page but defined elsewhere.
+    """
+    if data[0] != 247:
+        raise ValueError('no DVI data')
+    pos = 15+data[14]
+    preamble = data[:pos]
+    fontdefs = {}
+    pages = {}
+    while data[pos] != 248:
+        cmd = data[pos]
+        size = _operand_size(cmd, data, pos+1)
+        if cmd == 139:
+            counts = struct.unpack('>10i', data[pos+1:pos+41])
+            start = pos+1+size
+            used, defined = set(), set()
+        elif 171 <= cmd <= 234:
+            used.add(cmd-171)
+        elif 235 <= cmd <= 238:
+            used.add(int.from_bytes(data[pos+1:pos+1+size], 'big',
+                                    signed=cmd == 238))
+        elif 243 <= cmd <= 246:
+            k = cmd-242
+            number = int.from_bytes(data[pos+1:pos+1+k], 'big',
+                                    signed=cmd == 246)
+            fontdefs[number] = data[pos:pos+1+size]
+            defined.add(number)
+        elif cmd == 140:
+            pages[counts[3]] = (counts, data[start:pos+1], used-defined)
+        pos = pos+1+size
+    return preamble, fontdefs, pages
+
+def single_page_dvi(preamble, fontdefs, counts, content, fonts):
+    """Return a DVI file with one page made from the parts of split_dvi()."""
+    defs = b''.join(fontdefs[number] for number in sorted(fonts))
+    bop = struct.pack('>B10ii', 139, *counts, -1)
+    post_pos = len(preamble)+len(bop)+len(defs)+len(content)
+    post = (struct.pack('>Bi', 248, len(preamble))+preamble[2:14]
+            + struct.pack('>iiHH', 0, 0, 0, 1)+defs
+            + struct.pack('>BiB', 249, post_pos, 2))
+    padding = 4+(-(post_pos+len(post)+4)) % 4
+    return preamble+bop+defs+content+post+b'\xdf'*padding
+
+class CachedEngine:
+    """Text engine taking texts typeset before from a cache on disk.
+
+    base is the PyX engine used for the texts not found in the cache,
+    which is created with the remaining arguments.
+    """
+
+    def __init__(self, base=text.LatexEngine, *args, directory=None,
+                 **kwargs):
+        self.engine = base(*args, **kwargs)
+        self.identity = repr((pyx_version, base.__name__, args,
+                              sorted(kwargs.items())))
+        self.directory = directory or os.path.join(default_directory(),
+                                                   'text')
+        os.makedirs(self.directory, exist_ok=True)
+        self.preambles = []
+        self.started = False
+        self.pending = {}
+        instance = getattr(self.engine, 'instance', None)
+        self.caching = (pyx_version in SUPPORTED_PYX
+                        and hasattr(text, 'STATE_DONE')
+                        and all(hasattr(instance, name) for name in
+                                ('do_finish', '_cleanup', 'page', 'state')))
+
+    def preamble(self, expr, texmessages=[]):
+        """Register a preamble, which is run only if TeX is needed."""
+        if self.started:
+            self.engine.preamble(expr, texmessages)
+        self.preambles.append((expr, texmessages))
+
+    def reset(self, reinit=False):
+        self.engine.reset(reinit)
+        self.started = False
+        if not reinit:
+            self.preambles = []
+
+    def key(self, expr):
+        identity = repr((self.identity, [expr for expr, _ in self.preambles],
+                         expr))
+        return hashlib.sha256(identity.encode('utf-8')).hexdigest()
+
+    def text_pt(self, x_pt, y_pt, expr, textattrs=[], texmessages=[],
+                fontmap=None, singlecharmode=False):
+        """Return a text box like the text_pt method of PyX engines."""
+        if not self.caching:
+            self.start()
+            return self.engine.text_pt(x_pt, y_pt, expr, textattrs,
+                                       texmessages, fontmap, singlecharmode)
+        attrs = attr.mergeattrs(textattrs)
+        attr.checkattrs(attrs, [text.textattr, trafo.trafo_pt,
+                                style.fillstyle])
+        trafos = attr.getattrs(attrs, [trafo.trafo_pt])
+        fillstyles = attr.getattrs(attrs, [style.fillstyle])
+        texexpr = expr.tex if isinstance(expr, text.MultiEngineText) else expr
+        for textattr in attr.getattrs(attrs, [text.textattr])[::-1]:
+            texexpr = textattr.apply(texexpr)
+        key = self.key(texexpr)
+        path = os.path.join(self.directory, key)
+        try:
+            with open(path+'.json') as fh:
+                extents = json.load(fh)
+        except (OSError, ValueError):
+            return self.typeset(key, x_pt, y_pt, expr, textattrs, texmessages,
+                                fontmap, singlecharmode)
+
+        def read_page():
+            box._dvicanvas = DVIfile(path+'.dvi').readpage(
+                None, fontmap=fontmap, singlecharmode=singlecharmode,
+                attrs=[box.texttrafo]+fillstyles)
+
+        box = text.textextbox_pt(x_pt, y_pt, *extents, read_page, fontmap,
+                                 singlecharmode, fillstyles)
+        for t in trafos:
+            box.reltransform(t)
+        return box
+
+    def text(self, x, y, *args, **kwargs):
+        return self.text_pt(unit.topt(x), unit.topt(y), *args, **kwargs)
+
+    def start(self):
+        """Pass the registered preambles to the engine once."""
+        if not self.started:
+            for preamble, texmessages in self.preambles:
+                self.engine.preamble(preamble, texmessages)
+            self.started = True
+
+    def typeset(self, key, x_pt, y_pt, expr, *args):
+        self.start()
+        box = self.engine.text_pt(x_pt, y_pt, expr, *args)
+        instance = self.engine.instance
+        pending = self.pending.setdefault(id(instance), [])
+        pending.append((instance.page, key, [_pt(box.left), _pt(box.right),
+                                             _pt(box.height),
+                                             _pt(box.depth)]))
+        box.do_finish = lambda: self.finish(instance)
+        return box
+
+    def finish(self, instance):
+        """Finish the TeX run of instance and store its pages."""
+        if instance.state == text.STATE_DONE:
+            return
+        if not hasattr(instance, 'tmpdir'):
+            self.pending.pop(id(instance), None)
+            instance.do_finish()
+            return
+        instance.do_finish(cleanup=False)
+        try:
+            with open(os.path.join(instance.tmpdir, 'texput.dvi'), 'rb') as fh:
+                preamble, fontdefs, pages = split_dvi(fh.read())
+            for page, key, extents in self.pending.pop(id(instance), []):
+                path = os.path.join(self.directory, key)
+                tmpname = '{}.{}.tmp'.format(path, os.getpid())
+                with open(tmpname, 'wb') as fh:
+                    fh.write(single_page_dvi(preamble, fontdefs, *pages[page]))
+                os.replace(tmpname, path+'.dvi')
+                with open(tmpname, 'w') as fh:
+                    json.dump(extents, fh)
+                os.replace(tmpname, path+'.json')
+        finally:
+            atexit.unregister(instance._cleanup)
+            instance._cleanup()
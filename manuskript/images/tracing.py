@@ -0,0 +1,193 @@
+"""Timeline tracing of the tasks submitted to an executor.
+
+TracingExecutor wraps a thread or process pool and records for every task
+when it was submitted, when it entered the queue of the pool, when a worker
+started and finished it, and when its result was available again. For a
+process pool, the arguments and results are pickled by the tracer itself, so
+that the time spent on serialization, in the main process as well as in the
+worker, becomes visible as well.
+
+The recorded events can be written in the trace event format of Chrome,
+which can be viewed in chrome://tracing or Perfetto, or drawn as a timeline
+with PyX like in the figure of the parallel chapter.
+
+Failed tasks are recorded as well, with the repr of the exception under the
+key 'error'. If the task did not reach a worker, e.g. because its arguments
+could not be pickled or the pool broke, the worker times are missing and
+the event is left out of the trace and the timeline.
+"""
+
+from concurrent import futures
+import json
+import os
+import pickle
+import threading
+import time
+
+def traced_call(fn, args, kwargs, serialized):
+    """Run fn in a worker and return the result with timing information.
+
+    If fn raises, the timing information is attached to the exception.
+    """
+    info = {'pid': os.getpid(), 'tid': threading.get_native_id(),
+            'received': time.time()}
+    if serialized:
+        fn, args, kwargs = pickle.loads(args)
+    info['start'] = time.time()
+    try:
+        result = fn(*args, **kwargs)
+    except BaseException as exc:
+        info['end'] = info['sent'] = time.time()
+        exc._tracing_info = info
+        raise
+    info['end'] = time.time()
+    if serialized:
+        result = pickle.dumps(result, pickle.HIGHEST_PROTOCOL)
+    info['sent'] = time.time()
+    return info, result
+
+class TracingExecutor(futures.Executor):
+    """Executor recording the timeline of all tasks submitted to executor.
+
+    The events are collected in the list events, one dict per finished or
+    failed task with times in seconds since the epoch. Shutting the tracer
+    down shuts down the wrapped executor.
+    """
+
+    def __init__(self, executor, serialize=None):
+        self.executor = executor
+        if serialize is None:
+            serialize = isinstance(executor, futures.ProcessPoolExecutor)
+        self.serialize = serialize
+        self.events = []
+        self._lock = threading.Lock()
+
+    def submit(self, fn, /, *args, **kwargs):
+        func = getattr(fn, 'func', fn)
+        event = {'name': getattr(func, '__name__', repr(func)),
+                 'submit': time.time()}
+        if self.serialize:
+            try:
+                payload = pickle.dumps((fn, args, kwargs),
+                                       pickle.HIGHEST_PROTOCOL)
+            except Exception as exc:
+                # like a process pool, report the error through the future
+                event.update(finished=time.time(), error=repr(exc))
+                self._record(event)
+                outer = futures.Future()
+                outer.set_exception(exc)
+                return outer
+            event['queued'] = time.time()
+            inner = self.executor.submit(traced_call, None, payload, None,
+                                         True)
+        else:
+            event['queued'] = event['submit']
+            inner = self.executor.submit(traced_call, fn, args, kwargs, False)
+        outer = futures.Future()
+        outer.set_running_or_notify_cancel()
+        inner.add_done_callback(lambda f: self._finish(f, outer, event))
+        return outer
+
+    def _finish(self, inner, outer, event):
+        event['done'] = time.time()
+        info = {}
+        try:
+            info, result = inner.result()
+            if self.serialize:
+                result = pickle.loads(result)
+        except BaseException as exc:
+            event.update(getattr(exc, '_tracing_info', info),
+                         finished=time.time(), error=repr(exc))
+            self._record(event)
+            outer.set_exception(exc)
+            return
+        event.update(info, finished=time.time())
+        self._record(event)
+        outer.set_result(result)
+
+    def _record(self, event):
+        with self._lock:
+            self.events.append(event)
+
+    def shutdown(self, wait=True, *, cancel_futures=False):
+        self.executor.shutdown(wait=wait, cancel_futures=cancel_futures)
+
+    def clear(self):
+        with self._lock:
+            self.events = []
+
+def executed(events):
+    """Return the events of the tasks which reached a worker."""
+    return [event for event in events if 'start' in event]
+
+def workers(events):
+    """Return the (pid, tid) of all workers in the order of their first task."""
+    order = {}
+    for event in sorted(executed(events), key=lambda e: e['start']):
+        order.setdefault((event['pid'], event['tid']), len(order))
+    return order
+
+def chrome_trace(events, filename):
+    """Write events as a Chrome trace event file.
+
+    Each task appears as a slice on the thread of its worker, with the times
+    spent in the queue and on serialization as arguments. Pickling in the
+    main process and the waiting time in the queue are shown on separate
+    tracks of the main process.
+    """
+    if not events:
+        origin = 0
+    else:
+        origin = min(event['submit'] for event in events)
+    main = os.getpid()
+    thread = threading.get_native_id()
+
+    def us(t):
+        return (t-origin)*1e6
+
+    trace = []
+    for nr, event in enumerate(executed(events)):
+        args = {'queue': event['received']-event['queued'],
+                'serialize': ((event['queued']-event['submit'])
+                              + (event['sent']-event['end'])),
+                'deserialize': ((event['start']-event['received'])
+                                + (event['finished']-event['done']))}
+        if 'error' in event:
+            args['error'] = event['error']
+        trace.append({'name': event['name'], 'ph': 'X', 'pid': event['pid'],
+                      'tid': event['tid'], 'ts': us(event['start']),
+                      'dur': us(event['end'])-us(event['start']),
+                      'args': args})
+        trace.append({'name': 'queue', 'cat': 'queue', 'ph': 'b', 'id': nr,
+                      'pid': main, 'tid': thread, 'ts': us(event['queued'])})
+        trace.append({'name': 'queue', 'cat': 'queue', 'ph': 'e', 'id': nr,
+                      'pid': main, 'tid': thread, 'ts': us(event['received'])})
+        for name, begin, end in (('pickle', 'submit', 'queued'),
+                                 ('unpickle', 'done', 'finished')):
+            if event[end] > event[begin]:
+                trace.append({'name': name, 'ph': 'X', 'pid': main,
+                              'tid': thread, 'ts': us(event[begin]),
+                              'dur': us(event[end])-us(event[begin])})
+    with open(filename, 'w') as fh:
+        json.dump({'traceEvents': trace, 'displayTimeUnit': 'ms'}, fh)
+
+def draw_timeline(cnvs, events, origin=None, offset=0, cellheight=0.17):
+    """Draw the tasks of events as bars, one row per worker, onto cnvs.
+
+    The horizontal unit is one second after origin, which defaults to the
+    first submission. Returns the number of workers.
+    """
+    from pyx import color, deco, path
+
+    if origin is None:
+        origin = min(event['submit'] for event in events)
+    rows = workers(events)
+    hue = 0.667/max(len(rows)-1, 1)
+    for event in executed(events):
+        row = rows[(event['pid'], event['tid'])]
+        colours = color.hsb(hue*row, 1, 0.3)
+        colourf = color.hsb(hue*row, 0.2, 1)
+        cnvs.stroke(path.rect(event['start']-origin, row*cellheight+offset,
+                              event['end']-event['start'], 0.8*cellheight),
+                    [colours, deco.filled([colourf])])
+    return len(rows)
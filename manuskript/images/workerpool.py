@@ -0,0 +1,80 @@
+"""Warm process pool to be reused across the points of a benchmark sweep.
+
+A WarmPool starts all its workers right away and imports the requested
+modules in each of them, so that neither the start of the processes nor
+the import of NumPy ends up in the timed part of a benchmark.
+"""
+
+from concurrent import futures
+from contextlib import nullcontext
+import importlib
+import multiprocessing
+from multiprocessing import resource_tracker
+import os
+import sys
+import time
+
+def import_modules(modules):
+    """Initializer importing the given modules in a worker."""
+    for name in modules:
+        importlib.import_module(name)
+
+def worker_pid(delay):
+    """Return the process id of the worker after waiting for delay seconds."""
+    time.sleep(delay)
+    return os.getpid()
+
+def pool_context():
+    """Return the multiprocessing context for a new pool.
+
+    The worker threads of Numba's parallel target do not survive a fork, so
+    that the forkserver is used once Numba has been imported.
+    """
+    if 'numba' in sys.modules:
+        return multiprocessing.get_context('forkserver')
+    return multiprocessing.get_context()
+
+class WarmPool(futures.ProcessPoolExecutor):
+    """Process pool whose workers are started and initialized in advance.
+
+    It can be used wherever a ProcessPoolExecutor is expected. Leaving the
+    with-block or calling shutdown() terminates the workers.
+    """
+
+    def __init__(self, max_workers=4, modules=('numpy',)):
+        # Forked workers would otherwise start their own resource tracker
+        # when attaching to shared memory and complain about it at exit.
+        resource_tracker.ensure_running()
+        super().__init__(max_workers=max_workers,
+                         mp_context=pool_context(),
+                         initializer=import_modules,
+                         initargs=(tuple(modules),))
+        self.max_workers = max_workers
+        self.pids = self.warm_up()
+
+    def warm_up(self):
+        """Start all workers and return their process ids.
+
+        One task per worker is submitted at once, which makes the executor
+        start every worker. The tasks wait for a moment so that no worker can
+        pick up a second one, and they only run after the initializer has
+        finished.
+        """
+        delay = 0.01
+        while True:
+            wait_for = [self.submit(worker_pid, delay)
+                        for _ in range(self.max_workers)]
+            pids = set(f.result() for f in wait_for)
+            if len(pids) == self.max_workers or delay > 1:
+                return sorted(pids)
+            delay = 4*delay
+
+def worker_pool(executor=None, max_workers=4):
+    """Return a context for executor or, if it is None, for a new pool.
+
+    A given executor is not shut down when the context is left.
+    """
+    if executor is not None:
+        return nullcontext(executor)
+    return futures.ProcessPoolExecutor(max_workers=max_workers,
+                                       mp_context=pool_context())
@@ -0,0 +1,110 @@
+"""Riemann zeta function by chunked summation of its series.
+
+The examples of the parallel chapter sum 1/n**x term by term in a loop.
+Here, the terms are computed as NumPy arrays for a block of arguments x and
+a chunk of indices n at a time, where the product of both sizes is bounded
+by maxelements, so that many arguments can be evaluated at once without
+exhausting the memory. Within a chunk, np.sum adds the terms pairwise, and
+the chunk sums are accumulated with Neumaier's compensated summation.
+
+The range of indices is split into tasks which can be run by a thread pool,
+since NumPy releases the GIL while computing the powers, or by an executor
+like a workerpool.WarmPool.
+
+With tail=True, the remainder of the series is approximated by the
+Euler-Maclaurin formula, so that a few dozen terms give the full double
+precision, also for complex arguments and for real part less than one.
+"""
+
+from concurrent import futures
+from fractions import Fraction
+from functools import partial
+from math import factorial, fsum
+
+import numpy as np
+
+BERNOULLI = (Fraction(1, 6), Fraction(-1, 30), Fraction(1, 42),
+             Fraction(-1, 30), Fraction(5, 66), Fraction(-691, 2730),
+             Fraction(7, 6), Fraction(-3617, 510), Fraction(43867, 798),
+             Fraction(-174611, 330), Fraction(854513, 138),
+             Fraction(-236364091, 2730))
+EM_COEFFICIENTS = tuple(float(b/factorial(2*k+2))
+                        for k, b in enumerate(BERNOULLI))
+
+def partial_sum(x, start, stop, maxelements=2**20):
+    """Return the sum of n**-x for start <= n < stop for each x."""
+    x = np.asarray(x)
+    total = np.zeros(x.shape, dtype=np.result_type(x, np.float64))
+    compensation = np.zeros_like(total)
+    xblock = max(1, min(x.size, maxelements))
+    nchunk = max(1, maxelements//xblock)
+    xflat = x.reshape(-1)
+    totalflat = total.reshape(-1)
+    compflat = compensation.reshape(-1)
+    for i in range(0, xflat.size, xblock):
+        xs = xflat[i:i+xblock, np.newaxis]
+        s = totalflat[i:i+xblock]
+        c = compflat[i:i+xblock]
+        for n0 in range(start, stop, nchunk):
+            n = np.arange(n0, min(n0+nchunk, stop), dtype=np.float64)
+            chunk = np.sum(n**-xs, axis=1)
+            t = s+chunk
+            big = np.abs(s) >= np.abs(chunk)
+            c += np.where(big, (s-t)+chunk, (chunk-t)+s)
+            s[...] = t
+    return total+compensation
+
+def euler_maclaurin_tail(x, n):
+    """Return the Euler-Maclaurin approximation of the sum of k**-x, k >= n."""
+    x = np.asarray(x)
+    result = n**(1-x)/(x-1)+0.5*n**-x
+    term = x*n**(-x-1.)
+    for k, coefficient in enumerate(EM_COEFFICIENTS):
+        result = result+coefficient*term
+        term = term*(x+2*k+1)*(x+2*k+2)/n**2
+    return result
+
+def tail_terms(x):
+    """Return the number of terms for which the tail approximation suffices."""
+    return int(np.max(np.abs(x), initial=0))+20
+
+def zeta(x, nmax=None, tail=True, max_workers=1, executor=None, ntasks=None,
+         maxelements=2**20):
+    """Return the zeta function for x, which may be an array.
+
+    Without tail, the series is summed for n from 1 to nmax. With tail, the
+    first nmax-1 terms are summed and the remainder is approximated, where
+    nmax defaults to the value of tail_terms(), which suffices for double
+    precision. A smaller nmax is raised to this value, as the asymptotic
+    tail approximation diverges for small n.
+
+    The summation is split into ntasks tasks, by default four per worker,
+    which are run by executor or, for max_workers > 1, by a thread pool.
+    """
+    x = np.asarray(x)
+    if tail:
+        nmax = max(nmax or 0, tail_terms(x))
+    elif nmax is None:
+        raise ValueError('nmax is required without tail')
+    stop = nmax if tail else nmax+1
+    if ntasks is None:
+        ntasks = 1 if executor is None and max_workers == 1 else 4*max_workers
+    bounds = np.linspace(1, stop, ntasks+1).astype(np.int64)
+    ranges = [(int(a), int(b)) for a, b in zip(bounds[:-1], bounds[1:])
+              if b > a] or [(1, 1)]
+    if executor is None and max_workers == 1:
+        sums = [partial_sum(x, a, b, maxelements) for a, b in ranges]
+    else:
+        task = partial(partial_sum, x, maxelements=maxelements)
+        pool = executor or futures.ThreadPoolExecutor(max_workers)
+        try:
+            sums = list(pool.map(task, *zip(*ranges)))
+        finally:
+            if executor is None:
+                pool.shutdown()
+    sums = np.array(sums).reshape(len(ranges), -1)
+    total = np.array([fsum(s.real)+1j*fsum(s.imag) if np.iscomplexobj(s)
+                      else fsum(s) for s in sums.T]).reshape(x.shape)
+    if tail:
+        total = total+euler_maclaurin_tail(x, float(nmax))
+    return total[()]
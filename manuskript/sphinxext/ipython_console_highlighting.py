@@ -1,27 +1,58 @@
 """reST directive for syntax-highlighting ipython interactive sessions.
 
-XXX - See what improvements can be made based on the new (as of Sept 2009)
-'pycon' lexer for the python console.  At the very least it will give better
-highlighted tracebacks.
+Each line is classified by a single regular expression. The code following
+input, continuation and output prompts is collected in a list and handed to
+the Python lexer once per block, so that the time is linear in the length
+of the session. Tracebacks, starting with the separator line of IPython or
+with the header of the standard interpreter, extend up to the next input
+prompt and are highlighted by the Python traceback lexer.
+
+The extension also caches the highlighted code blocks of the HTML and LaTeX
+builders in the doctree directory. An entry is keyed on the SHA-256 hash of
+the code, the lexer and its options, the formatter and its style, and the
+versions of Pygments, Sphinx and this module, so that unchanged blocks are
+not highlighted again in later builds. Blocks for which the highlighter
+emits a warning are not stored, so that the warning is repeated in every
+build and a build with -W fails independently of the cache. Hits update the
+modification time of their entry, and at the end of the build the least
+recently used entries are removed as long as the cache exceeds
+highlight_cache_size bytes.
+
+The numbers of hits and misses are reported at the end of the build. They
+are counted in memory. Since parallel writes take place in forked
+processes, each of these saves its counts once in a file of the cache
+directory when it exits, and these files are summed up and removed at the
+end of the build.
+
+The extension keeps no state on module level and declares itself safe for
+parallel reading and writing.
 """
 
 #-----------------------------------------------------------------------------
 # Needed modules
 
 # Standard library
+import hashlib
+from logging import WARNING, Handler
+from multiprocessing import util
+import os
 import re
 
 # Third party
 from pygments.lexer import Lexer, do_insertions
-from pygments.lexers.agile import (PythonConsoleLexer, PythonLexer, 
-                                   PythonTracebackLexer)
-from pygments.token import Comment, Generic
+from pygments.lexers import PythonLexer, PythonTracebackLexer
+from pygments.token import Comment, Generic, Other
 
-from sphinx import highlighting
+import pygments
+import sphinx
+from sphinx.util import logging
 
 #-----------------------------------------------------------------------------
 # Global constants
 line_re = re.compile('.*?\n')
+with open(__file__, 'rb') as fh:
+    module_hash = hashlib.sha256(fh.read()).hexdigest()
+logger = logging.getLogger(__name__)
 
 #-----------------------------------------------------------------------------
 # Code begins - classes and functions
@@ -37,78 +68,260 @@ class IPythonConsoleLexer(Lexer):
       In [2]: a
       Out[2]: 'foo'
 
-      In [3]: print a
+      In [3]: print(a)
       foo
 
       In [4]: 1 / 0
 
     Notes:
 
-      - Tracebacks are not currently supported.
+      - Lines of tracebacks which the traceback lexer does not recognize,
+        like the frame headers of IPython, are marked as traceback.
 
       - It assumes the default IPython prompts, not customized ones.
     """
-    
+
     name = 'IPython console session'
     aliases = ['ipython']
     mimetypes = ['text/x-ipython-console']
-    input_prompt = re.compile("(In \[[0-9]+\]: )|(   \.\.\.+:)")
-    output_prompt = re.compile("(Out\[[0-9]+\]: )|(   \.\.\.+:)")
-    continue_prompt = re.compile("   \.\.\.+:")
-    tb_start = re.compile("\-+")
+    line_kind = re.compile(r"""(?P<comment>\#)
+                             | (?P<input>In\ \[[0-9]+\]:\ )
+                             | (?P<continuation>\ {3}\.\.\.+:)
+                             | (?P<output>Out\[[0-9]+\]:\ )
+                             | (?P<traceback>-{75}\s*$
+                                            |Traceback\ \(most\ recent\ call\ last\):)
+                           """, re.VERBOSE)
+    prompt_tokens = {'input': Generic.Prompt, 'continuation': Generic.Prompt,
+                     # Use the 'error' token for output.  We should probably
+                     # make our own token, but error is typicaly in a bright
+                     # color like red, so it works fine for our output prompts.
+                     'output': Generic.Error}
 
     def get_tokens_unprocessed(self, text):
         pylexer = PythonLexer(**self.options)
         tblexer = PythonTracebackLexer(**self.options)
 
-        curcode = ''
+        blockstart = 0
+        code = []
+        codelength = 0
         insertions = []
+        tbstart = None
         for match in line_re.finditer(text):
             line = match.group()
-            input_prompt = self.input_prompt.match(line)
-            continue_prompt = self.continue_prompt.match(line.rstrip())
-            output_prompt = self.output_prompt.match(line)
-            if line.startswith("#"):
-                insertions.append((len(curcode),
-                                   [(0, Comment, line)]))
-            elif input_prompt is not None:
-                insertions.append((len(curcode),
-                                   [(0, Generic.Prompt, input_prompt.group())]))
-                curcode += line[input_prompt.end():]
-            elif continue_prompt is not None:
-                insertions.append((len(curcode),
-                                   [(0, Generic.Prompt, continue_prompt.group())]))
-                curcode += line[continue_prompt.end():]
-            elif output_prompt is not None:
-                # Use the 'error' token for output.  We should probably make
-                # our own token, but error is typicaly in a bright color like
-                # red, so it works fine for our output prompts.
-                insertions.append((len(curcode),
-                                   [(0, Generic.Error, output_prompt.group())]))
-                curcode += line[output_prompt.end():]
+            prompt = self.line_kind.match(line)
+            kind = prompt.lastgroup if prompt is not None else None
+            if tbstart is not None:
+                if kind != 'input':
+                    continue
+                yield from self.traceback_tokens(tblexer, text, tbstart,
+                                                 match.start())
+                tbstart = None
+            if not insertions:
+                blockstart = match.start()
+            if kind == 'comment':
+                insertions.append((codelength, [(0, Comment, line)]))
+            elif kind in self.prompt_tokens:
+                insertions.append((codelength, [(0, self.prompt_tokens[kind],
+                                                 prompt.group())]))
+                code.append(line[prompt.end():])
+                codelength += len(code[-1])
             else:
-                if curcode:
-                    for item in do_insertions(insertions,
-                                              pylexer.get_tokens_unprocessed(curcode)):
-                        yield item
-                        curcode = ''
-                        insertions = []
-                yield match.start(), Generic.Output, line
-        if curcode:
-            for item in do_insertions(insertions,
-                                      pylexer.get_tokens_unprocessed(curcode)):
-                yield item
+                if insertions:
+                    yield from self.code_tokens(pylexer, blockstart,
+                                                insertions, code)
+                    code = []
+                    codelength = 0
+                    insertions = []
+                if kind == 'traceback':
+                    tbstart = match.start()
+                else:
+                    yield match.start(), Generic.Output, line
+        if tbstart is not None:
+            yield from self.traceback_tokens(tblexer, text, tbstart,
+                                             len(text))
+        elif insertions:
+            yield from self.code_tokens(pylexer, blockstart, insertions, code)
 
+    def code_tokens(self, pylexer, start, insertions, code):
+        """Highlight a block of code with the prompts as insertions."""
+        tokens = pylexer.get_tokens_unprocessed(''.join(code))
+        for index, token, value in do_insertions(insertions, tokens):
+            yield start+index, token, value
 
-def setup(app):
-    """Setup as a sphinx extension."""
+    def traceback_tokens(self, tblexer, text, start, end):
+        """Highlight the traceback text[start:end]."""
+        for index, token, value in tblexer.get_tokens_unprocessed(
+                text[start:end]):
+            yield (start+index, Generic.Traceback if token is Other else token,
+                   value)
 
-    # This is only a lexer, so adding it below to pygments appears sufficient.
-    # But if somebody knows that the right API usage should be to do that via
-    # sphinx, by all means fix it here.  At least having this setup.py
-    # suppresses the sphinx warning we'd get without it.
-    pass
 
-#-----------------------------------------------------------------------------
-# Register the extension as a valid pygments lexer
-highlighting.lexers['ipython'] = IPythonConsoleLexer()
+class WarningCounter(Handler):
+    """Logging handler counting the warnings of a logger."""
+
+    def __init__(self):
+        super().__init__(WARNING)
+        self.warnings = 0
+
+    def emit(self, record):
+        self.warnings += 1
+
+
+class HighlightCache:
+    """Cache of highlighted code blocks in a directory with hit counts."""
+
+    def __init__(self, directory, maxsize):
+        self.directory = directory
+        self.maxsize = maxsize
+        self.pid = os.getpid()
+        self.hits = 0
+        self.misses = 0
+        os.makedirs(directory, exist_ok=True)
+
+    def key(self, bridge, source, lang, opts, force, kwargs):
+        identity = repr((pygments.__version__, sphinx.__version__,
+                         module_hash, bridge.dest, bridge.formatter.__name__,
+                         sorted(bridge.formatter_args.items()),
+                         bridge.latex_engine, lang, sorted((opts or {}).items()),
+                         force, sorted(kwargs.items())))
+        h = hashlib.sha256(identity.encode('utf-8'))
+        h.update(source.encode('utf-8', 'surrogateescape'))
+        return h.hexdigest()
+
+    def highlight_block(self, bridge, source, lang, opts=None, force=False,
+                        location=None, **kwargs):
+        if not isinstance(source, str):
+            source = source.decode()
+        path = os.path.join(self.directory,
+                            self.key(bridge, source, lang, opts, force, kwargs))
+        try:
+            with open(path, encoding='utf-8') as fh:
+                highlighted = fh.read()
+            os.utime(path)
+        except OSError:
+            pass
+        else:
+            self.count(hit=True)
+            return highlighted
+        self.count(hit=False)
+        counter = WarningCounter()
+        highlight_logger = logging.getLogger('sphinx.highlighting').logger
+        highlight_logger.addHandler(counter)
+        try:
+            highlighted = bridge.highlight_block(source, lang, opts, force,
+                                                 location, **kwargs)
+        finally:
+            highlight_logger.removeHandler(counter)
+        if counter.warnings:
+            return highlighted
+        tmpname = '{}.{}.tmp'.format(path, os.getpid())
+        with open(tmpname, 'w', encoding='utf-8') as fh:
+            fh.write(highlighted)
+        os.replace(tmpname, path)
+        return highlighted
+
+    def count(self, hit):
+        """Count a hit or miss."""
+        if self.pid != os.getpid():
+            # forked for a parallel write, start counting anew and save
+            # the counts when the process exits
+            self.pid = os.getpid()
+            self.hits = self.misses = 0
+            util.Finalize(self, self.save_counts, exitpriority=0)
+        if hit:
+            self.hits += 1
+        else:
+            self.misses += 1
+
+    def save_counts(self):
+        """Save the counts of a forked process for totals()."""
+        with open(os.path.join(self.directory,
+                               'counts-{}.txt'.format(self.pid)), 'w') as fh:
+            fh.write('{} {}\n'.format(self.hits, self.misses))
+
+    def totals(self):
+        """Return the counts of this and all forked processes.
+
+        The files of the forked processes are removed.
+        """
+        hits, misses = self.hits, self.misses
+        for name in os.listdir(self.directory):
+            if name.startswith('counts-'):
+                path = os.path.join(self.directory, name)
+                with open(path) as fh:
+                    h, m = fh.read().split()
+                hits += int(h)
+                misses += int(m)
+                os.unlink(path)
+        return hits, misses
+
+    def trim(self):
+        """Remove the least recently used entries exceeding maxsize."""
+        entries = []
+        for entry in os.scandir(self.directory):
+            if len(entry.name) == 64:
+                stat = entry.stat()
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.maxsize:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total = total-size
+
+
+class CachingBridge:
+    """Pygments bridge taking highlighted blocks from a HighlightCache."""
+
+    def __init__(self, bridge, cache):
+        self.bridge = bridge
+        self.cache = cache
+
+    def highlight_block(self, *args, **kwargs):
+        return self.cache.highlight_block(self.bridge, *args, **kwargs)
+
+    def __getattr__(self, name):
+        return getattr(self.bridge, name)
+
+
+def install_cache(app):
+    """Make the builder of app use a highlight cache."""
+    builder = app.builder
+    if builder.format not in ('html', 'latex'):
+        return
+    builder.highlight_cache = HighlightCache(
+        os.path.join(app.doctreedir, 'highlight'),
+        app.config.highlight_cache_size)
+    if getattr(builder, 'highlighter', None) is not None:
+        builder.highlighter = CachingBridge(builder.highlighter,
+                                            builder.highlight_cache)
+    if builder.format == 'latex':
+        # The LaTeX translator creates its own highlighter.
+        base = app.registry.get_translator_class(builder)
+
+        class CachingTranslator(base):
+            def __init__(self, *args, **kwargs):
+                super().__init__(*args, **kwargs)
+                self.highlighter = CachingBridge(self.highlighter,
+                                                 self.builder.highlight_cache)
+
+        app.set_translator(builder.name, CachingTranslator, override=True)
+
+
+def report_cache(app, exception):
+    cache = getattr(app.builder, 'highlight_cache', None)
+    if cache is not None:
+        logger.info('highlight cache: %d hits, %d misses', *cache.totals())
+        cache.trim()
+
+
+def setup(app):
+    """Setup as a sphinx extension."""
+    app.add_lexer('ipython', IPythonConsoleLexer)
+    app.add_config_value('highlight_cache_size', 2**26, '')
+    app.connect('builder-inited', install_cache)
+    app.connect('build-finished', report_cache)
+    return {'parallel_read_safe': True, 'parallel_write_safe': True}
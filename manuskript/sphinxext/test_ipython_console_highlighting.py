@@ -0,0 +1,123 @@
+"""Tests of the IPython console lexer and of the highlight cache.
+
+Run by python -m unittest test_ipython_console_highlighting in the
+sphinxext directory.
+"""
+
+import io
+import os
+import tempfile
+import unittest
+
+from pygments.token import Comment, Generic
+from sphinx.application import Sphinx
+
+from ipython_console_highlighting import IPythonConsoleLexer
+
+SESSION = """\
+In [1]: a = 'foo'
+
+In [2]: def f(x):
+   ...:     return 2*x
+   ...:
+
+In [3]: a
+Out[3]: 'foo'
+
+# a comment
+In [4]: 1 / 0
+---------------------------------------------------------------------------
+ZeroDivisionError                         Traceback (most recent call last)
+<ipython-input-4-05c9758a9c21> in <module>()
+----> 1 1 / 0
+
+ZeroDivisionError: division by zero
+
+In [5]: print(a)
+foo
+"""
+
+class LexerTest(unittest.TestCase):
+
+    def tokens(self, text):
+        return list(IPythonConsoleLexer().get_tokens_unprocessed(text))
+
+    def test_lossless(self):
+        tokens = self.tokens(SESSION)
+        self.assertEqual(''.join(value for _, _, value in tokens), SESSION)
+        positions = [index for index, _, _ in tokens]
+        self.assertEqual(positions, sorted(positions))
+        for index, _, value in tokens:
+            self.assertEqual(SESSION[index:index+len(value)], value)
+
+    def test_kinds(self):
+        tokens = self.tokens(SESSION)
+        prompts = [value for _, token, value in tokens
+                   if token is Generic.Prompt]
+        self.assertEqual(prompts, ['In [1]: ', 'In [2]: ', '   ...:',
+                                   '   ...:', 'In [3]: ', 'In [4]: ',
+                                   'In [5]: '])
+        self.assertIn((SESSION.index('Out[3]'), Generic.Error, 'Out[3]: '),
+                      tokens)
+        self.assertIn((SESSION.index('# a'), Comment, '# a comment\n'),
+                      tokens)
+        self.assertIn((SESSION.index('foo\n', SESSION.index('print')),
+                       Generic.Output, 'foo\n'), tokens)
+        traceback = [token for index, token, _ in tokens
+                     if SESSION.index('-----') <= index
+                     < SESSION.index('In [5]')]
+        self.assertTrue(traceback)
+        self.assertNotIn(Generic.Prompt, traceback)
+
+INDEX = """\
+Test
+====
+
+.. code-block:: python
+
+   x = (1 +
+   $ %%
+
+.. code-block:: ipython
+
+   In [1]: a = 1
+
+::
+
+   def f(): pass
+"""
+
+class HighlightCacheTest(unittest.TestCase):
+
+    def build(self, directory):
+        status = io.StringIO()
+        warning = io.StringIO()
+        app = Sphinx(directory, directory, os.path.join(directory, 'out'),
+                     os.path.join(directory, 'doctrees'), 'html',
+                     status=status, warning=warning, freshenv=True)
+        app.build()
+        lexing = [line for line in warning.getvalue().splitlines()
+                  if 'Lexing literal_block' in line]
+        counts = [line for line in status.getvalue().splitlines()
+                  if 'highlight cache' in line]
+        return lexing, counts
+
+    def test_warnings_repeated(self):
+        with tempfile.TemporaryDirectory() as directory:
+            with open(os.path.join(directory, 'conf.py'), 'w') as fh:
+                fh.write('import sys\n'
+                         'sys.path.insert(0, {!r})\n'
+                         "extensions = ['ipython_console_highlighting']\n"
+                         "highlight_language = 'python'\n"
+                         .format(os.path.dirname(os.path.abspath(__file__))))
+            with open(os.path.join(directory, 'index.rst'), 'w') as fh:
+                fh.write(INDEX)
+            lexing, counts = self.build(directory)
+            self.assertEqual(len(lexing), 1)
+            self.assertTrue(counts[0].endswith('0 hits, 3 misses'))
+            lexing, counts = self.build(directory)
+            self.assertEqual(len(lexing), 1)
+            self.assertTrue(counts[0].endswith('2 hits, 1 misses'))
+
+if __name__ == '__main__':
+    unittest.main()